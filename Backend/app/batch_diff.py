@@ -0,0 +1,299 @@
+import operator
+from itertools import compress
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.diff_engine import (
+    DiffEngine,
+    DEFAULT_DIFF_OPTIONS,
+    ToleranceRules,
+    _compact_diff,
+    _numeric_tolerance,
+    _render_path,
+    _tolerance_rules,
+    _within_tolerance,
+)
+from app.models import DiffOptions
+
+try:
+    import numpy as np
+except ImportError:  # Columns are compared with plain Python instead
+    np = None
+
+# Pairs whose shape is shared by fewer pairs than this are diffed one by one
+BATCH_MIN_GROUP = 4
+
+# Integers beyond this don't survive a round trip through float64
+_MAX_EXACT_FLOAT = 2 ** 53
+
+
+# Column kinds, from _flatten_pair
+_LEAF = 0
+_MISSING_IN_V1 = 1
+_MISSING_IN_V2 = 2
+_TYPE_MISMATCH = 3
+
+# Shape tokens for a skipped equal container, a container type mismatch and a
+# container whose children come later (so each position is marked leaf or not)
+_EQUAL = "="
+_MISMATCH = "!"
+_NESTED = "+"
+
+
+def _flatten_pair(v1: Any, v2: Any, with_keys: bool = False):
+    """Flatten a (v1, v2) pair into columns.
+
+    Returns a shape signature, the v1 and v2 column values, and (with
+    ``with_keys``) the (kind, key path) of each column. Pairs with equal
+    signatures line up column by column. Equal containers are skipped. A
+    pair of leaves is a _LEAF column; keys or items on one side only and
+    mismatched types involving a container are columns of their own,
+    holding the value on each side (None on the missing one).
+    """
+    shape = []
+    values1 = []
+    values2 = []
+    columns = [] if with_keys else None
+    add_token, add1, add2 = shape.append, values1.append, values2.append
+    stack = [((v1, v2, ()),)]
+    pop, push = stack.pop, stack.append
+
+    while stack:
+        # Each stack entry holds the children of one container; leaves are
+        # taken first, then the containers, so every row orders columns alike
+        children = pop()
+        nested = []
+        for a, b, keys in children:
+            type_a, type_b = type(a), type(b)
+            a_container = type_a is dict or type_a is list
+            b_container = type_b is dict or type_b is list
+            if not a_container and not b_container:
+                add_token(None)
+                add1(a)
+                add2(b)
+                if with_keys:
+                    columns.append((_LEAF, keys))
+            elif type_a is not type_b:
+                add_token(_MISMATCH)
+                add1(a)
+                add2(b)
+                if with_keys:
+                    columns.append((_TYPE_MISMATCH, keys))
+            else:
+                add_token(_NESTED)
+                nested.append((a, b, keys))
+
+        for a, b, keys in reversed(nested):
+            try:
+                if a == b:
+                    add_token(_EQUAL)
+                    continue
+            except RecursionError:
+                pass
+
+            grandchildren = []
+            if type(a) is dict:
+                keys_a, keys_b = tuple(a), tuple(b)
+                if keys_a == keys_b:
+                    add_token(keys_a)
+                    if with_keys:
+                        grandchildren = [(a[key], b[key], keys + (key,)) for key in keys_a]
+                    else:
+                        grandchildren = list(zip(a.values(), b.values(), keys_a))
+                    push(grandchildren)
+                    continue
+                add_token((keys_a, keys_b))
+                extra = []
+                for key in keys_a:
+                    if key in b:
+                        grandchildren.append((a[key], b[key], keys + (key,) if with_keys else keys))
+                    else:
+                        extra.append((_MISSING_IN_V2, a[key], None, key))
+                extra.extend((_MISSING_IN_V1, None, b[key], key) for key in keys_b if key not in a)
+            else:
+                common = min(len(a), len(b))
+                add_token(len(a) if len(a) == len(b) else (len(a), len(b)))
+                if with_keys:
+                    grandchildren = [(a[i], b[i], keys + (i,)) for i in range(common)]
+                else:
+                    grandchildren = list(zip(a, b, range(common)))
+                extra = [(_MISSING_IN_V2, a[i], None, i) for i in range(common, len(a))]
+                extra.extend((_MISSING_IN_V1, None, b[i], i) for i in range(common, len(b)))
+            for kind, value1, value2, key in extra:
+                add1(value1)
+                add2(value2)
+                if with_keys:
+                    columns.append((kind, keys + (key,)))
+            push(grandchildren)
+    return tuple(shape), values1, values2, columns
+
+
+def _link(keys: tuple) -> Any:
+    """Path link (see diff_engine._render_path) for a key path"""
+    node: Any = ""
+    for key in keys:
+        node = (node, key, isinstance(key, int))
+    return node
+
+
+def _structural_differences(kind: int, keys: tuple, column1: Sequence[Any], column2: Sequence[Any],
+                            options: DiffOptions) -> List[Dict[str, Any]]:
+    """One difference per row of a missing or type-mismatch column, as deep_compare reports it"""
+    node = _link(keys)
+    path = _render_path(node)
+    if kind == _TYPE_MISMATCH:
+        template = {"path": path, "type": "type_mismatch", "v1_value": None, "v2_value": None,
+                    "v1_type": None, "v2_type": None, "severity": "high"}
+    elif kind == _MISSING_IN_V1:
+        template = {"path": path, "type": "missing_in_v1", "v1_value": None, "v2_value": None, "severity": "medium"}
+    else:
+        template = {"path": path, "type": "missing_in_v2", "v1_value": None, "v2_value": None, "severity": "high"}
+    # With one side missing only the path can make this expected, so it holds
+    # for every row. Extra list items are never expected; extra keys may be
+    if kind != _TYPE_MISMATCH and not isinstance(keys[-1], int) and \
+            DiffEngine.is_expected_difference(path, template["type"], None, None):
+        template["is_expected"] = True
+        template["severity"] = "low" if kind == _MISSING_IN_V1 else "medium"
+
+    differences = []
+    for v1, v2 in zip(column1, column2):
+        diff = dict(template)
+        diff["v1_value"] = v1
+        diff["v2_value"] = v2
+        if kind == _TYPE_MISMATCH:
+            diff["v1_type"] = type(v1).__name__
+            diff["v2_type"] = type(v2).__name__
+        differences.append(_compact_diff(diff, node, options.compact_value_bytes) if options.compact else diff)
+    return differences
+
+
+def _leaf_difference(path: str, node: Any, v1: Any, v2: Any, options: DiffOptions) -> Dict[str, Any]:
+    """The difference for two unequal leaf values, as deep_compare reports it"""
+    if type(v1) is not type(v2):
+        diff = {
+            "path": path,
+            "type": "type_mismatch",
+            "v1_value": v1,
+            "v2_value": v2,
+            "v1_type": type(v1).__name__,
+            "v2_type": type(v2).__name__,
+            "severity": "high"
+        }
+    else:
+        diff = {"path": path, "type": "value_mismatch", "v1_value": v1, "v2_value": v2, "severity": "medium"}
+        if DiffEngine.is_expected_difference(path, "value_mismatch", v1, v2):
+            diff["is_expected"] = True
+            diff["severity"] = "low"
+    return _compact_diff(diff, node, options.compact_value_bytes) if options.compact else diff
+
+
+def _column_mismatches(column1: Sequence[Any], column2: Sequence[Any], node: Any,
+                       rules: Optional[ToleranceRules]) -> List[int]:
+    """Rows where two leaf columns hold unequal values (by ==, as deep_compare checks,
+    then by numeric tolerance if any rules are given)"""
+    if np is not None:
+        types = set(map(type, column1)) | set(map(type, column2))
+        if rules and types == {int, float}:
+            # The int or float rule is picked per pair (see _within_tolerance),
+            # so rows where both sides are ints are checked apart from the rest
+            int_rows = [row for row, (v1, v2) in enumerate(zip(column1, column2))
+                        if type(v1) is int and type(v2) is int]
+            if int_rows:
+                int_set = set(int_rows)
+                other_rows = [row for row in range(len(column1)) if row not in int_set]
+                mismatches = []
+                for rows in (int_rows, other_rows):
+                    found = _column_mismatches([column1[row] for row in rows], [column2[row] for row in rows],
+                                               node, rules)
+                    mismatches.extend(rows[position] for position in found)
+                return sorted(mismatches)
+        if types and types <= {int, float}:
+            tolerance = _numeric_tolerance(node, types == {int}, rules) if rules else None
+            dtype = np.int64 if types == {int} and tolerance is None else np.float64
+            try:
+                array1 = np.asarray(column1, dtype=dtype)
+                array2 = np.asarray(column2, dtype=dtype)
+            except OverflowError:
+                array1 = None
+            if array1 is not None and tolerance is not None:
+                # math.isclose, vectorized
+                absolute, relative = tolerance
+                bound = np.maximum(relative * np.maximum(np.abs(array1), np.abs(array2)), absolute)
+                return np.flatnonzero((array1 != array2) & ~(np.abs(array1 - array2) <= bound)).tolist()
+            if array1 is not None and (dtype is np.int64 or (
+                    np.abs(array1).max(initial=0) < _MAX_EXACT_FLOAT and np.abs(array2).max(initial=0) < _MAX_EXACT_FLOAT)):
+                return np.flatnonzero(array1 != array2).tolist()
+    mismatches = compress(range(len(column1)), map(operator.ne, column1, column2))
+    if rules:
+        return [row for row in mismatches if not _within_tolerance(column1[row], column2[row], node, rules)]
+    return list(mismatches)
+
+
+def _compare_group(pairs: Sequence[Tuple[Any, Any]], rows: List[int], values1: List[List[Any]],
+                   values2: List[List[Any]], options: DiffOptions, results: List[List[Dict[str, Any]]]) -> None:
+    """Diff a group of pairs that flattened to the same shape"""
+    first1, first2 = pairs[rows[0]]
+    columns = _flatten_pair(first1, first2, with_keys=True)[3]
+    columns1 = list(zip(*values1))
+    columns2 = list(zip(*values2))
+    rules = _tolerance_rules(options.numeric_tolerances) if options.numeric_tolerances else None
+    for (kind, keys), column1, column2 in zip(columns, columns1, columns2):
+        if kind != _LEAF:
+            for row, diff in zip(rows, _structural_differences(kind, keys, column1, column2, options)):
+                results[row].append(diff)
+            continue
+        
+        node = _link(keys)
+        mismatches = _column_mismatches(column1, column2, node, rules)
+        if not mismatches:
+            continue
+        path = _render_path(node)
+        for position in mismatches:
+            results[rows[position]].append(
+                _leaf_difference(path, node, column1[position], column2[position], options)
+            )
+
+
+def compare_batch(pairs: Sequence[Tuple[Any, Any]], options: Optional[DiffOptions] = None) -> List[List[Dict[str, Any]]]:
+    """Diff many (v1, v2) pairs at once, column by column.
+
+    Each pair is flattened into columns (skipping subtrees that are equal
+    on both sides) and pairs with the same shape are grouped. Within a
+    group, whole leaf columns are compared at once (with NumPy for numeric
+    columns when it is installed, numeric tolerances included), and
+    difference records are only built for the rows where a column differs.
+    Small groups, and options that need more than positional list
+    comparison (list alignment, unordered paths, a diff budget), go
+    through deep_compare.
+
+    Returns each pair's differences, as deep_compare would report them
+    (possibly in a different order).
+    """
+    options = options or DEFAULT_DIFF_OPTIONS
+    results: List[List[Dict[str, Any]]] = [[] for _ in pairs]
+    if (options.list_alignment != "index" or options.unordered_paths
+            or options.max_differences or options.max_depth or options.max_value_bytes):
+        return [DiffEngine.deep_compare(v1, v2, options=options) for v1, v2 in pairs]
+
+    groups: Dict[tuple, Tuple[List[int], List[List[Any]], List[List[Any]]]] = {}
+    for row, (v1, v2) in enumerate(pairs):
+        try:
+            if v1 == v2:
+                continue
+        except RecursionError:
+            pass
+        shape, values1, values2, _ = _flatten_pair(v1, v2)
+        group = groups.get(shape)
+        if group is None:
+            group = groups[shape] = ([], [], [])
+        group[0].append(row)
+        group[1].append(values1)
+        group[2].append(values2)
+
+    for rows, values1, values2 in groups.values():
+        if len(rows) < BATCH_MIN_GROUP:
+            for row in rows:
+                v1, v2 = pairs[row]
+                results[row] = DiffEngine.deep_compare(v1, v2, options=options)
+        else:
+            _compare_group(pairs, rows, values1, values2, options, results)
+    return results
@@ -25,6 +25,7 @@ if supabase_url and supabase_key and supabase_url != "Change" and supabase_key !
         print("⚠️  Continuing without database - using in-memory storage")
         supabase_client = None
 else:
+    supabase_client = None
     print("⚠️  Supabase not configured - using in-memory storage")
     print("   Set SUPABASE_URL and SUPABASE_KEY (or DATABASE_URL) in .env file")
 
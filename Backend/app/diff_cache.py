@@ -0,0 +1,70 @@
+import os
+import hashlib
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+from app.diff_engine import DiffEngine, DEFAULT_DIFF_OPTIONS
+from app.models import DiffOptions
+
+# Diff results kept for response pairs seen before; 0 disables the cache
+DIFF_CACHE_SIZE = int(os.getenv("DIFF_CACHE_SIZE", "256"))
+
+
+def content_hash(body: bytes) -> bytes:
+    """Digest of a raw response body, computed once per response and shared by the caches"""
+    return hashlib.blake2b(body, digest_size=16).digest()
+
+
+class DiffResultCache:
+    """Bounded LRU of diff results, keyed by the two bodies' content hashes and the diff options"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(v1_hash: bytes, v2_hash: bytes, options: Optional[DiffOptions]) -> Hashable:
+        # The expected-difference matcher is replaced whenever a pattern is
+        # registered, so results computed under older patterns stop matching
+        return v1_hash, v2_hash, options or DEFAULT_DIFF_OPTIONS, DiffEngine._expected_matcher
+
+    def get(self, key: Hashable) -> Any:
+        if not self.max_size:
+            return None
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: Hashable, entry: Any) -> None:
+        if not self.max_size:
+            return
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": bool(self.max_size),
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+diff_cache = DiffResultCache(DIFF_CACHE_SIZE)
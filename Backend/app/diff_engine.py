@@ -1,7 +1,529 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, FrozenSet, Iterator, List, Optional, Tuple
 import json
+import math
 import re
+from collections import Counter
 from datetime import datetime
+from functools import lru_cache
+
+from app.models import DiffOptions, NumericTolerance, RegressionVerdict
+from app import list_alignment
+
+UUID_PATTERN = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', re.IGNORECASE)
+
+def _looks_like_uuid(value: str) -> bool:
+    """UUID check with a cheap length/dash test before the regex"""
+    return len(value) == 36 and value[8] == '-' and UUID_PATTERN.match(value) is not None
+
+def _is_iso_datetime(value: str) -> bool:
+    """ISO datetime check that skips fromisoformat for strings that can't be dates"""
+    # Every ISO date starts with a 4-digit year and is at least 7 chars (e.g. 2024W01)
+    if len(value) < 7 or not value[:4].isdigit():
+        return False
+    try:
+        datetime.fromisoformat(value.replace('Z', '+00:00'))
+        return True
+    except ValueError:
+        return False
+
+# Work item kinds for DiffEngine.iter_differences
+_COMPARE = 0
+_DICT_MISSING_IN_V1 = 1
+_DICT_MISSING_IN_V2 = 2
+_LIST_MISSING_IN_V1 = 3
+_LIST_MISSING_IN_V2 = 4
+_LIST_MOVED = 5
+
+DEFAULT_DIFF_OPTIONS = DiffOptions()
+
+def _render_path(node: Any) -> str:
+    """Turn a lazy (parent, key, is_index) path link into a dotted path string"""
+    segments = []
+    while isinstance(node, tuple):
+        node, key, is_index = node
+        segments.append((key, is_index))
+    path = node
+    for key, is_index in reversed(segments):
+        if is_index:
+            path = f"{path}[{key}]"
+        else:
+            path = f"{path}.{key}" if path else key
+    return path
+
+def _escape_pointer_token(token: Any) -> str:
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+def _render_pointer(node: Any) -> str:
+    """Turn a lazy path link into a JSON pointer (RFC 6901), e.g. /items/3/name"""
+    tokens = []
+    while isinstance(node, tuple):
+        node, key, _ = node
+        tokens.append(_escape_pointer_token(key))
+    if node:
+        tokens.append(_escape_pointer_token(node))
+    return "".join(f"/{token}" for token in reversed(tokens))
+
+def difference_path(diff: Dict[str, Any], default: str = "unknown") -> str:
+    """A difference's dotted path, rebuilt from the pointer for a compact difference.
+    
+    A pointer doesn't say which tokens are list indexes, so numeric ones
+    come back as [i]; good enough for showing the path to people.
+    """
+    if "path" in diff:
+        return diff["path"]
+    pointer = diff.get("pointer")
+    if pointer is None:
+        return default
+    path = ""
+    for token in pointer.split("/")[1:]:
+        key = token.replace("~1", "/").replace("~0", "~")
+        if key.isdigit():
+            path = f"{path}[{key}]"
+        else:
+            path = f"{path}.{key}" if path else key
+    return path
+
+def _compact_diff(diff: Dict[str, Any], node: Any, max_value_bytes: int) -> Dict[str, Any]:
+    """Compact form of a difference: JSON pointer, types, and only the small values.
+    
+    Values whose encoding is over ``max_value_bytes`` are left out (and
+    ``values_elided`` set); read them from the responses via the pointer.
+    The missing side of a missing_in_v1/v2 difference has no value or type.
+    """
+    diff_type = diff["type"]
+    compact = {
+        "pointer": _render_pointer(node),
+        "type": diff_type,
+        "severity": diff["severity"],
+    }
+    if diff.get("is_expected"):
+        compact["is_expected"] = True
+    for side, absent in (("v1", "missing_in_v1"), ("v2", "missing_in_v2")):
+        if diff_type == absent:
+            compact[f"{side}_type"] = None
+            continue
+        value = diff[f"{side}_value"]
+        compact[f"{side}_type"] = diff.get(f"{side}_type") or type(value).__name__
+        if _value_size(value, max_value_bytes) <= max_value_bytes:
+            compact[f"{side}_value"] = value
+        else:
+            compact["values_elided"] = True
+    return compact
+
+def _subtree_key(node: Any) -> str:
+    """Path of the top-level subtree a path link falls under (the root path itself for the root)"""
+    first = None
+    while isinstance(node, tuple):
+        first = node
+        node = node[0]
+    return node if first is None else _render_path(first)
+
+def _depth(node: Any, limit: int) -> int:
+    """Nesting depth of a path link below the compared root, counted up to limit"""
+    depth = 0
+    while isinstance(node, tuple) and depth < limit:
+        node = node[0]
+        depth += 1
+    return depth
+
+def _value_size(value: Any, limit: int) -> int:
+    """Approximate JSON-encoded size of a value, giving up once it passes limit"""
+    size = 0
+    stack = [value]
+    while stack and size <= limit:
+        value = stack.pop()
+        if isinstance(value, dict):
+            size += 2 + sum(len(str(key)) + 4 for key in value)
+            stack.extend(value.values())
+        elif isinstance(value, list):
+            size += 2 + len(value)
+            stack.extend(value)
+        elif isinstance(value, str):
+            size += len(value) + 2
+        else:
+            size += len(str(value))
+    return size
+
+class DiffBudget:
+    """Limits for one comparison, and a record of where they cut it short.
+    
+    A limit of None or 0 means no limit. After the walk, ``truncated`` and
+    ``reason`` say whether differences were left out, and ``summary`` maps
+    each top-level subtree to the number of differences reported under it
+    and the number of pending comparisons that were never made.
+    """
+    
+    __slots__ = ("max_differences", "max_depth", "max_value_bytes", "differences", "value_bytes",
+                 "truncated", "reason", "summary", "full")
+    
+    def __init__(self, max_differences: Optional[int] = None, max_depth: Optional[int] = None,
+                 max_value_bytes: Optional[int] = None):
+        self.max_differences = max_differences or 0
+        self.max_depth = max_depth or 0
+        self.max_value_bytes = max_value_bytes or 0
+        self.differences = 0
+        self.value_bytes = 0
+        self.truncated = False
+        self.reason: Optional[str] = None
+        self.summary: Dict[str, Dict[str, int]] = {}
+        # Set once the walk should stop
+        self.full = False
+    
+    @classmethod
+    def from_options(cls, options: DiffOptions) -> "DiffBudget":
+        return cls(options.max_differences, options.max_depth, options.max_value_bytes)
+    
+    def _count(self, node: Any, field: str) -> None:
+        counts = self.summary.get(_subtree_key(node))
+        if counts is None:
+            counts = self.summary[_subtree_key(node)] = {"differences": 0, "unexplored": 0}
+        counts[field] += 1
+    
+    def skip(self, node: Any, reason: str) -> None:
+        """Record a comparison that was left out"""
+        self._count(node, "unexplored")
+        if not self.truncated:
+            self.truncated = True
+            self.reason = reason
+    
+    def admit(self, node: Any, diff: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Account for a difference found at ``node``.
+        
+        Returns it to be reported (with its values dropped if they cross
+        ``max_value_bytes``), or None if the budget was already used up.
+        Once ``full`` is set the caller should stop looking for more.
+        """
+        if self.full:
+            self.skip(node, self.reason or "max_differences")
+            return None
+        if self.max_differences and self.differences >= self.max_differences:
+            self.full = True
+            self.skip(node, "max_differences")
+            return None
+        self.differences += 1
+        self._count(node, "differences")
+        if self.max_value_bytes:
+            remaining = self.max_value_bytes - self.value_bytes
+            size = _value_size(diff.get("v1_value"), remaining)
+            size += _value_size(diff.get("v2_value"), remaining - size)
+            self.value_bytes += size
+            if self.value_bytes > self.max_value_bytes:
+                # Keep the types so the difference can still be classified
+                if "pointer" in diff:  # Compact differences always carry their types
+                    diff.pop("v1_value", None)
+                    diff.pop("v2_value", None)
+                else:
+                    diff.setdefault("v1_type", type(diff["v1_value"]).__name__)
+                    diff.setdefault("v2_type", type(diff["v2_value"]).__name__)
+                    diff["v1_value"] = None
+                    diff["v2_value"] = None
+                diff["values_omitted"] = True
+                self.full = True
+                if not self.truncated:
+                    self.truncated = True
+                    self.reason = "max_value_bytes"
+        return diff
+
+class HashNode:
+    """Merkle hash of one container subtree, with its children's hashes.
+    
+    Hashes follow Python equality (1, 1.0 and True hash alike, dict key order
+    is ignored), so subtrees that compare equal with ``==`` hash alike. The
+    converse doesn't hold - hashes can collide - so a match still has to be
+    confirmed with ``==``.
+    ``children`` maps keys (dict) or holds items (list); a child is either
+    another HashNode or, for scalars, its plain int hash.
+    """
+    
+    __slots__ = ("hash", "children")
+    
+    def __init__(self, hash_value: int, children: Any):
+        self.hash = hash_value
+        self.children = children
+
+def _leaf_hash(value: Any) -> int:
+    # Strings are tagged so they can't collide with numbers (hash("") == hash(0))
+    if isinstance(value, str):
+        return hash(("str", value))
+    return hash(("value", value))
+
+def _node_hash(node: Any) -> int:
+    return node.hash if type(node) is HashNode else node
+
+def build_hash_tree(obj: Any, unordered_paths: FrozenSet[str] = frozenset(), path: str = "") -> Any:
+    """Hash every subtree of a JSON document bottom-up, without recursion.
+    
+    Lists whose [*]-pattern path is in ``unordered_paths`` are hashed as
+    multisets, so reordering them doesn't change any hash. ``path`` is the
+    pattern path of ``obj`` itself when hashing a fragment.
+    """
+    if not isinstance(obj, (dict, list)):
+        return _leaf_hash(obj)
+    
+    track_paths = bool(unordered_paths)
+    results: List[HashNode] = []
+    stack = [(obj, False, path)]
+    while stack:
+        value, expanded, value_path = stack.pop()
+        is_dict = isinstance(value, dict)
+        if not expanded:
+            stack.append((value, True, value_path))
+            if not track_paths:
+                items = value.values() if is_dict else value
+                stack.extend((child, False, None) for child in items if isinstance(child, (dict, list)))
+            elif is_dict:
+                stack.extend((child, False, f"{value_path}.{key}" if value_path else key)
+                             for key, child in value.items() if isinstance(child, (dict, list)))
+            else:
+                stack.extend((child, False, f"{value_path}[*]") for child in value if isinstance(child, (dict, list)))
+            continue
+        
+        # Container children were pushed in order, so they finished last-to-first
+        # and the first container child is now at the end of results
+        finished = results.pop
+        items = value.values() if is_dict else value
+        kids = [None if isinstance(child, (dict, list)) else _leaf_hash(child) for child in items]
+        for i, kid in enumerate(kids):
+            if kid is None:
+                kids[i] = finished()
+        if is_dict:
+            children = dict(zip(value.keys(), kids))
+            node_hash = hash(("dict", frozenset((key, _node_hash(kid)) for key, kid in children.items())))
+        elif track_paths and value_path in unordered_paths:
+            children = kids
+            node_hash = hash(("bag", frozenset(Counter(_node_hash(kid) for kid in kids).items())))
+        else:
+            children = kids
+            node_hash = hash(("list", tuple(_node_hash(kid) for kid in kids)))
+        results.append(HashNode(node_hash, children))
+    return results[0]
+
+def _render_pattern_path(node: Any) -> str:
+    """Render a path link with every list index written as [*]"""
+    segments = []
+    while isinstance(node, tuple):
+        node, key, is_index = node
+        segments.append((key, is_index))
+    path = node
+    for key, is_index in reversed(segments):
+        if is_index:
+            path = f"{path}[*]"
+        else:
+            path = f"{path}.{key}" if path else key
+    return path
+
+ToleranceRules = Tuple[Dict[str, Tuple[float, float]], Dict[str, Tuple[float, float]]]
+
+@lru_cache(maxsize=64)
+def _tolerance_rules(tolerances: Tuple[NumericTolerance, ...]) -> ToleranceRules:
+    """Index numeric tolerances as (abs, rel) by pattern path and by type ("*" for all numbers)"""
+    by_path: Dict[str, Tuple[float, float]] = {}
+    by_type: Dict[str, Tuple[float, float]] = {}
+    for rule in tolerances:
+        tolerance = (rule.abs_tolerance, rule.rel_tolerance)
+        if rule.path is not None:
+            by_path[rule.path] = tolerance
+        else:
+            by_type[rule.type or "*"] = tolerance
+    return by_path, by_type
+
+def _numeric_tolerance(node: Any, both_int: bool, rules: ToleranceRules) -> Optional[Tuple[float, float]]:
+    """The (abs, rel) tolerance for numbers at a path, if any rule covers them"""
+    by_path, by_type = rules
+    tolerance = by_path.get(_render_pattern_path(node)) if by_path else None
+    if tolerance is None:
+        tolerance = by_type.get("int" if both_int else "float") or by_type.get("*")
+    return tolerance
+
+def _within_tolerance(v1: Any, v2: Any, node: Any, rules: ToleranceRules) -> bool:
+    """Whether two numbers (not bools) are equal within their tolerance"""
+    type1, type2 = type(v1), type(v2)
+    if (type1 is not int and type1 is not float) or (type2 is not int and type2 is not float):
+        return False
+    tolerance = _numeric_tolerance(node, type1 is int and type2 is int, rules)
+    return tolerance is not None and math.isclose(v1, v2, rel_tol=tolerance[1], abs_tol=tolerance[0])
+
+def _element_hashes(items: List[Any], tree: Any, unordered_paths: FrozenSet[str], list_path: str) -> List[int]:
+    if tree is not None:
+        return [_node_hash(kid) for kid in tree.children]
+    element_path = f"{list_path}[*]" if unordered_paths else ""
+    return [_node_hash(build_hash_tree(item, unordered_paths, element_path)) for item in items]
+
+def _same_element(item1: Any, item2: Any, node: Any, options: DiffOptions) -> bool:
+    """Whether two list elements with equal hashes really match (hashes can collide)"""
+    try:
+        if item1 == item2:
+            return True
+    except RecursionError:
+        pass
+    # Unequal as they stand, but lists inside may be unordered and only reordered
+    if not options.unordered_paths:
+        return False
+    return next(DiffEngine.iter_differences(item1, item2, node, options=options), None) is None
+
+def _align_list(list1: List[Any], list2: List[Any], node: Any, tree1: Any, tree2: Any,
+                mode: str, options: DiffOptions) -> List[tuple]:
+    """Work items for a list pair under "key", "lcs" or "unordered" alignment, ready to push.
+    
+    Matched elements are diffed against each other and reported under their
+    v2 index; elements only in v2 are missing_in_v1 (v2 index), elements only
+    in v1 are missing_in_v2 (v1 index), and with "key" alignment elements
+    that changed relative order also get a "moved" difference. "unordered"
+    only matches identical elements, so it reports additions and removals.
+    """
+    if mode == "key":
+        ops = list_alignment.align_by_key(list1, list2, options.list_key)
+    else:
+        unordered_paths = frozenset(options.unordered_paths)
+        list_path = _render_pattern_path(node) if unordered_paths else ""
+        hashes1 = _element_hashes(list1, tree1, unordered_paths, list_path)
+        hashes2 = _element_hashes(list2, tree2, unordered_paths, list_path)
+        if mode == "unordered":
+            element = (node, 0, True)
+            ops = list_alignment.align_unordered(
+                hashes1, hashes2, lambda i, j: _same_element(list1[i], list2[j], element, options)
+            )
+        else:
+            ops = list_alignment.align_by_content(hashes1, hashes2)
+    
+    items = []
+    for op, i, j in ops:
+        if op == list_alignment.PAIR:
+            if tree1 is not None:
+                items.append((_COMPARE, list1[i], list2[j], (node, j, True), tree1.children[i], tree2.children[j]))
+            else:
+                items.append((_COMPARE, list1[i], list2[j], (node, j, True), None, None))
+        elif op == list_alignment.MOVED:
+            items.append((_LIST_MOVED, i, j, (node, j, True), None, None))
+        elif op == list_alignment.INSERTED:
+            items.append((_LIST_MISSING_IN_V1, None, list2[j], (node, j, True), None, None))
+        else:
+            items.append((_LIST_MISSING_IN_V2, list1[i], None, (node, i, True), None, None))
+    # Reversed so they pop off the stack in report order
+    items.reverse()
+    return items
+
+# Regression diffs of these types push severity to high/critical
+CRITICAL_DIFF_TYPES = ("missing_in_v2", "type_mismatch", "v2_error")
+
+def _is_regression_diff(diff: Dict[str, Any]) -> bool:
+    """Decide whether a single unexpected diff should be treated as a regression.
+    
+    Regressions are:
+    - Type mismatches and fields removed in v2 (missing_in_v2)
+    - Error statuses (response_error, v1_error, v2_error, both_errors)
+    - Value mismatches where the two sides have different types
+    - Anything else with high severity
+    
+    NOT regressions:
+    - Pure value mismatches where the types are the same (e.g. generated IDs,
+      timestamps, or other differing values)
+    - New fields in v2 (missing_in_v1)
+    """
+    diff_type = diff.get("type", "")
+    
+    # Always regress for these structural/problematic types
+    if diff_type in ("type_mismatch", "missing_in_v2", "response_error"):
+        return True
+    
+    # Any error-related diffs should be treated as regressions
+    if diff_type in ("v1_error", "v2_error", "both_errors"):
+        return True
+    
+    # Value mismatches: if both sides exist and have the same type, treat as non-regression
+    if diff_type == "value_mismatch":
+        v1_type = diff.get("v1_type") or (type(diff.get("v1_value")).__name__ if "v1_value" in diff else None)
+        v2_type = diff.get("v2_type") or (type(diff.get("v2_value")).__name__ if "v2_value" in diff else None)
+        
+        # If both types are present and equal, this is a value-only difference -> not a regression
+        if v1_type and v2_type and v1_type == v2_type:
+            return False
+        
+        # If types differ or are missing, be conservative and treat as regression
+        return True
+    
+    # Missing_in_v1 (new fields in v2) is usually not a regression
+    if diff_type == "missing_in_v1":
+        return False
+    
+    # Otherwise, fall back to severity: high severity is a regression
+    return diff.get("severity") == "high"
+
+class RegressionClassifier:
+    """Running regression verdict, fed one difference at a time (see DiffEngine.classify)"""
+    
+    __slots__ = ("risk_counts", "counts_by_type", "is_regression", "high_count", "medium_count", "critical_count")
+    
+    def __init__(self):
+        self.risk_counts = {"low": 0, "medium": 0, "high": 0}
+        self.counts_by_type: Dict[str, int] = {}
+        self.is_regression = False
+        self.high_count = 0
+        self.medium_count = 0
+        self.critical_count = 0
+    
+    def add(self, diff: Dict[str, Any]) -> None:
+        diff_type = diff.get("type", "")
+        self.counts_by_type[diff_type] = self.counts_by_type.get(diff_type, 0) + 1
+        if diff.get("is_expected", False):
+            return
+        
+        severity = diff.get("severity", "low")
+        if severity == "high" or severity == "critical":
+            self.risk_counts["high"] += 1
+        elif severity == "medium":
+            self.risk_counts["medium"] += 1
+        else:
+            self.risk_counts["low"] += 1
+        
+        if _is_regression_diff(diff):
+            self.is_regression = True
+            if severity == "high":
+                self.high_count += 1
+            elif severity == "medium":
+                self.medium_count += 1
+            if diff_type in CRITICAL_DIFF_TYPES:
+                self.critical_count += 1
+    
+    def verdict(self) -> RegressionVerdict:
+        if not self.is_regression:
+            severity = "none"
+        elif self.critical_count > 0 or self.high_count > 0:
+            severity = "critical" if (self.critical_count > 2 or self.high_count > 3) else "high"
+        elif self.medium_count > 0:
+            severity = "medium" if self.medium_count > 3 else "low"
+        else:
+            severity = "low"
+        
+        return RegressionVerdict(
+            is_regression=self.is_regression,
+            severity=severity,
+            risk_counts=dict(self.risk_counts),
+            counts_by_type=dict(self.counts_by_type)
+        )
+
+class ExpectedDifferenceMatcher:
+    """All expected-difference path patterns compiled into one regex.
+
+    Verdicts are memoized per path, since the same paths come up again on
+    every comparison of an endpoint.
+    """
+    
+    MEMO_SIZE = 65536
+    
+    def __init__(self, patterns: List[str]):
+        self.patterns = list(patterns)
+        self._regex = re.compile("|".join(f"(?:{p})" for p in self.patterns), re.IGNORECASE) if self.patterns else None
+        self._memo: Dict[str, bool] = {}
+    
+    def matches(self, path: str) -> bool:
+        verdict = self._memo.get(path)
+        if verdict is None:
+            verdict = self._regex is not None and self._regex.search(path) is not None
+            if len(self._memo) >= self.MEMO_SIZE:
+                self._memo.clear()
+            self._memo[path] = verdict
+        return verdict
 
 class DiffEngine:
     """Core diff engine for comparing API responses"""
@@ -21,36 +543,30 @@ class DiffEngine:
         r'date$',
     ]
     
+    _expected_matcher = ExpectedDifferenceMatcher(EXPECTED_DIFFERENCE_PATTERNS)
+    
+    @staticmethod
+    def register_expected_pattern(pattern: str) -> None:
+        """Add a path regex whose value differences should be treated as expected"""
+        re.compile(pattern)  # Fail fast on an invalid pattern
+        DiffEngine.EXPECTED_DIFFERENCE_PATTERNS.append(pattern)
+        DiffEngine._expected_matcher = ExpectedDifferenceMatcher(DiffEngine.EXPECTED_DIFFERENCE_PATTERNS)
+    
     @staticmethod
     def is_expected_difference(path: str, diff_type: str, v1_value: Any, v2_value: Any) -> bool:
         """Check if a difference is expected/acceptable (e.g., generated IDs, timestamps)"""
         # Check if path matches expected difference patterns
-        for pattern in DiffEngine.EXPECTED_DIFFERENCE_PATTERNS:
-            if re.search(pattern, path, re.IGNORECASE):
-                # For value mismatches in expected fields, they're acceptable
-                if diff_type == "value_mismatch":
-                    return True
-                # For missing fields that are expected to differ, check if it's a generated field
-                if diff_type in ["missing_in_v1", "missing_in_v2"]:
-                    # If it's a generated field pattern, it's acceptable
-                    return True
+        if diff_type in ("value_mismatch", "missing_in_v1", "missing_in_v2") and DiffEngine._expected_matcher.matches(path):
+            # Value mismatches and missing generated fields are acceptable
+            return True
         
-        # Check if values look like UUIDs (both are strings and match UUID pattern)
-        uuid_pattern = r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$'
         if isinstance(v1_value, str) and isinstance(v2_value, str):
-            if re.match(uuid_pattern, v1_value, re.IGNORECASE) and re.match(uuid_pattern, v2_value, re.IGNORECASE):
+            # Check if values look like UUIDs
+            if _looks_like_uuid(v1_value) and _looks_like_uuid(v2_value):
                 return True
-        
-        # Check if values are timestamps (ISO format strings or numeric timestamps)
-        if isinstance(v1_value, str) and isinstance(v2_value, str):
-            try:
-                # Try parsing as ISO datetime
-                datetime.fromisoformat(v1_value.replace('Z', '+00:00'))
-                datetime.fromisoformat(v2_value.replace('Z', '+00:00'))
-                # Both are valid timestamps, difference is expected
+            # Check if values are timestamps (ISO format strings)
+            if _is_iso_datetime(v1_value) and _is_iso_datetime(v2_value):
                 return True
-            except:
-                pass
         
         # Check if both are numeric and likely timestamps (Unix timestamps)
         if isinstance(v1_value, (int, float)) and isinstance(v2_value, (int, float)):
@@ -63,227 +579,255 @@ class DiffEngine:
         return False
     
     @staticmethod
-    def deep_compare(obj1: Any, obj2: Any, path: str = "") -> List[Dict[str, Any]]:
-        """Recursively compare two objects and return differences"""
-        differences = []
+    def deep_compare(obj1: Any, obj2: Any, path: str = "", hashed: bool = False,
+                     v1_tree: Optional[HashNode] = None, v2_tree: Optional[HashNode] = None,
+                     options: Optional[DiffOptions] = None,
+                     budget: Optional[DiffBudget] = None) -> List[Dict[str, Any]]:
+        """Compare two objects and return the list of differences"""
+        return list(DiffEngine.iter_differences(obj1, obj2, path, hashed, v1_tree, v2_tree, options, budget))
+    
+    @staticmethod
+    def hash_tree(obj: Any, options: Optional[DiffOptions] = None) -> HashNode:
+        """Precompute subtree hashes, e.g. for a v1 baseline compared against many v2 responses
+        
+        Pass the same options the tree will be compared with, since unordered
+        paths change how lists are hashed.
+        """
+        return build_hash_tree(obj, frozenset((options or DEFAULT_DIFF_OPTIONS).unordered_paths))
+    
+    @staticmethod
+    def iter_differences(obj1: Any, obj2: Any, path: str = "", hashed: bool = False,
+                         v1_tree: Optional[HashNode] = None, v2_tree: Optional[HashNode] = None,
+                         options: Optional[DiffOptions] = None,
+                         budget: Optional[DiffBudget] = None) -> Iterator[Dict[str, Any]]:
+        """Yield the differences between two objects, in deep_compare order.
+        
+        Walks both documents with an explicit stack instead of recursion, so
+        nesting depth isn't bounded by the interpreter's recursion limit.
+        Paths are kept as (parent, key, is_index) links and only rendered
+        to strings for the differences that are actually emitted.
+        
+        With ``hashed`` (or when a precomputed tree is passed), every subtree
+        is hashed once up front: children whose hashes differ are known to
+        differ without re-checking equality at every level, and only
+        children with matching hashes are confirmed with ``==``.
+        
+        ``options.list_alignment`` controls how list elements are paired, and
+        lists under ``options.unordered_paths`` are compared as multisets;
+        see _align_list.
         
-        # Both are None or same value
-        if obj1 == obj2:
-            return differences
+        Numbers covered by ``options.numeric_tolerances`` that are equal
+        within tolerance are treated as equal, including int vs float.
         
-        # Type mismatch
-        if type(obj1) != type(obj2):
-            differences.append({
-                "path": path,
-                "type": "type_mismatch",
-                "v1_value": obj1,
-                "v2_value": obj2,
-                "v1_type": str(type(obj1).__name__),
-                "v2_type": str(type(obj2).__name__),
-                "severity": "high"
-            })
-            return differences
+        With ``options.compact`` the differences use the compact form from
+        _compact_diff instead of carrying full values and dotted paths.
         
-        # Dictionary comparison
-        if isinstance(obj1, dict):
-            all_keys = set(obj1.keys()) | set(obj2.keys())
+        With a ``budget`` (built from the options' limits if they set any),
+        containers below ``max_depth`` aren't descended into, and the walk
+        stops at ``max_differences`` differences or once the embedded values
+        pass ``max_value_bytes`` (the difference that crosses it is still
+        reported, with its values dropped). The budget records what was cut.
+        """
+        options = options or DEFAULT_DIFF_OPTIONS
+        positional_lists = options.list_alignment == "index"
+        unordered_paths = frozenset(options.unordered_paths)
+        if hashed or v1_tree is not None or v2_tree is not None:
+            v1_tree = v1_tree or build_hash_tree(obj1, unordered_paths, path)
+            v2_tree = v2_tree or build_hash_tree(obj2, unordered_paths, path)
+        if budget is None and (options.max_differences or options.max_depth or options.max_value_bytes):
+            budget = DiffBudget.from_options(options)
+        max_depth = budget.max_depth if budget is not None else 0
+        compact = options.compact
+        tolerances = _tolerance_rules(options.numeric_tolerances) if options.numeric_tolerances else None
+        
+        stack = [(_COMPARE, obj1, obj2, path, v1_tree, v2_tree)]
+        pop = stack.pop
+        push = stack.append
+        
+        while stack:
+            kind, obj1, obj2, node, tree1, tree2 = pop()
+            diff = None
             
-            for key in all_keys:
-                new_path = f"{path}.{key}" if path else key
+            if kind == _COMPARE:
+                # Both are None or same value
+                # With hash trees only subtrees whose hashes match are checked with ==
+                # (hashes can collide, e.g. hash(-1) == hash(-2)); the rest differ for sure
+                if tree1 is None or _node_hash(tree1) == _node_hash(tree2):
+                    try:
+                        if obj1 == obj2:
+                            continue
+                    except RecursionError:
+                        # Too deep for the built-in comparison - walk it level by level instead
+                        pass
                 
-                if key not in obj1:
+                # Numbers within tolerance never become differences
+                if tolerances is not None and _within_tolerance(obj1, obj2, node, tolerances):
+                    continue
+                
+                # Type mismatch
+                if type(obj1) != type(obj2):
                     diff = {
-                        "path": new_path,
-                        "type": "missing_in_v1",
-                        "v1_value": None,
-                        "v2_value": obj2[key],
-                        "severity": "medium"
+                        "path": _render_path(node),
+                        "type": "type_mismatch",
+                        "v1_value": obj1,
+                        "v2_value": obj2,
+                        "v1_type": str(type(obj1).__name__),
+                        "v2_type": str(type(obj2).__name__),
+                        "severity": "high"
                     }
-                    if DiffEngine.is_expected_difference(new_path, "missing_in_v1", None, obj2[key]):
-                        diff["is_expected"] = True
-                        diff["severity"] = "low"
-                    differences.append(diff)
-                elif key not in obj2:
+                
+                # Differing containers past the depth budget are only counted
+                elif max_depth and isinstance(obj1, (dict, list)) and _depth(node, max_depth) >= max_depth:
+                    budget.skip(node, "max_depth")
+                
+                # Dictionary comparison: queue children in reverse so they pop in key order
+                elif isinstance(obj1, dict):
+                    children = []
+                    for key in set(obj1.keys()) | set(obj2.keys()):
+                        child = (node, key, False)
+                        if key not in obj1:
+                            children.append((_DICT_MISSING_IN_V1, None, obj2[key], child, None, None))
+                        elif key not in obj2:
+                            children.append((_DICT_MISSING_IN_V2, obj1[key], None, child, None, None))
+                        elif tree1 is not None:
+                            children.append((_COMPARE, obj1[key], obj2[key], child,
+                                             tree1.children[key], tree2.children[key]))
+                        else:
+                            children.append((_COMPARE, obj1[key], obj2[key], child, None, None))
+                    children.reverse()
+                    stack.extend(children)
+                
+                # Unordered list comparison
+                elif isinstance(obj1, list) and unordered_paths and _render_pattern_path(node) in unordered_paths:
+                    stack.extend(_align_list(obj1, obj2, node, tree1, tree2, "unordered", options))
+                
+                # List comparison, aligned by key or content
+                elif isinstance(obj1, list) and not positional_lists:
+                    stack.extend(_align_list(obj1, obj2, node, tree1, tree2, options.list_alignment, options))
+                
+                # List comparison
+                elif isinstance(obj1, list):
+                    len1 = len(obj1)
+                    len2 = len(obj2)
+                    for i in range(max(len1, len2) - 1, -1, -1):
+                        child = (node, i, True)
+                        if i >= len1:
+                            push((_LIST_MISSING_IN_V1, None, obj2[i], child, None, None))
+                        elif i >= len2:
+                            push((_LIST_MISSING_IN_V2, obj1[i], None, child, None, None))
+                        elif tree1 is not None:
+                            push((_COMPARE, obj1[i], obj2[i], child, tree1.children[i], tree2.children[i]))
+                        else:
+                            push((_COMPARE, obj1[i], obj2[i], child, None, None))
+                
+                # Primitive value comparison
+                else:
+                    diff_path = _render_path(node)
                     diff = {
-                        "path": new_path,
-                        "type": "missing_in_v2",
-                        "v1_value": obj1[key],
-                        "v2_value": None,
-                        "severity": "high"  # Regression - field removed
+                        "path": diff_path,
+                        "type": "value_mismatch",
+                        "v1_value": obj1,
+                        "v2_value": obj2,
+                        "severity": "medium"
                     }
-                    # Only mark as expected if it's a generated field (like timestamps that might not be in v2)
-                    if DiffEngine.is_expected_difference(new_path, "missing_in_v2", obj1[key], None):
+                    # Mark as expected if it matches expected patterns
+                    if DiffEngine.is_expected_difference(diff_path, "value_mismatch", obj1, obj2):
                         diff["is_expected"] = True
-                        diff["severity"] = "medium"  # Still medium severity even if expected
-                    differences.append(diff)
-                else:
-                    differences.extend(
-                        DiffEngine.deep_compare(obj1[key], obj2[key], new_path)
-                    )
-        
-        # List comparison
-        elif isinstance(obj1, list):
-            max_len = max(len(obj1), len(obj2))
+                        diff["severity"] = "low"  # Lower severity for expected differences
             
-            for i in range(max_len):
-                new_path = f"{path}[{i}]"
-                
-                if i >= len(obj1):
-                    differences.append({
-                        "path": new_path,
-                        "type": "missing_in_v1",
-                        "v1_value": None,
-                        "v2_value": obj2[i],
-                        "severity": "medium"
-                    })
-                elif i >= len(obj2):
-                    differences.append({
-                        "path": new_path,
-                        "type": "missing_in_v2",
-                        "v1_value": obj1[i],
-                        "v2_value": None,
-                        "severity": "high"
-                    })
-                else:
-                    differences.extend(
-                        DiffEngine.deep_compare(obj1[i], obj2[i], new_path)
-                    )
-        
-        # Primitive value comparison
-        else:
-            # Check if this is an expected difference before adding it
-            diff = {
-                "path": path,
-                "type": "value_mismatch",
-                "v1_value": obj1,
-                "v2_value": obj2,
-                "severity": "medium"
-            }
-            # Mark as expected if it matches expected patterns
-            if DiffEngine.is_expected_difference(path, "value_mismatch", obj1, obj2):
-                diff["is_expected"] = True
-                diff["severity"] = "low"  # Lower severity for expected differences
-            differences.append(diff)
+            elif kind == _DICT_MISSING_IN_V1:
+                diff_path = _render_path(node)
+                diff = {
+                    "path": diff_path,
+                    "type": "missing_in_v1",
+                    "v1_value": None,
+                    "v2_value": obj2,
+                    "severity": "medium"
+                }
+                if DiffEngine.is_expected_difference(diff_path, "missing_in_v1", None, obj2):
+                    diff["is_expected"] = True
+                    diff["severity"] = "low"
+            
+            elif kind == _DICT_MISSING_IN_V2:
+                diff_path = _render_path(node)
+                diff = {
+                    "path": diff_path,
+                    "type": "missing_in_v2",
+                    "v1_value": obj1,
+                    "v2_value": None,
+                    "severity": "high"  # Regression - field removed
+                }
+                # Only mark as expected if it's a generated field (like timestamps that might not be in v2)
+                if DiffEngine.is_expected_difference(diff_path, "missing_in_v2", obj1, None):
+                    diff["is_expected"] = True
+                    diff["severity"] = "medium"  # Still medium severity even if expected
+            
+            elif kind == _LIST_MISSING_IN_V1:
+                diff = {
+                    "path": _render_path(node),
+                    "type": "missing_in_v1",
+                    "v1_value": None,
+                    "v2_value": obj2,
+                    "severity": "medium"
+                }
+            
+            elif kind == _LIST_MISSING_IN_V2:
+                diff = {
+                    "path": _render_path(node),
+                    "type": "missing_in_v2",
+                    "v1_value": obj1,
+                    "v2_value": None,
+                    "severity": "high"
+                }
+            
+            else:  # _LIST_MOVED: obj1/obj2 are the element's v1 and v2 indexes
+                diff = {
+                    "path": _render_path(node),
+                    "type": "moved",
+                    "v1_value": obj1,
+                    "v2_value": obj2,
+                    "severity": "low"
+                }
+            
+            if diff is None:
+                continue
+            if compact:
+                diff = _compact_diff(diff, node, options.compact_value_bytes)
+            if budget is None:
+                yield diff
+                continue
+            
+            diff = budget.admit(node, diff)
+            if diff is not None:
+                yield diff
+            if budget.full:
+                break
         
-        return differences
+        # Whatever is still queued was never compared
+        if budget is not None:
+            for item in stack:
+                budget.skip(item[3], budget.reason)
     
     @staticmethod
-    def detect_regressions(differences: List[Dict[str, Any]]) -> bool:
-        """Determine if differences constitute regressions
+    def classify(differences: List[Dict[str, Any]]) -> RegressionVerdict:
+        """Classify a list of differences in a single pass
         
-        Regressions are:
-        - Missing fields in v2 (field removed) - unless it's an expected generated field
-        - Type mismatches
-        - Error status differences
-        - Value mismatches in non-generated fields
-        
-        NOT regressions:
-        - Generated IDs (UUIDs, auto-increment IDs)
-        - Timestamps (created_at, updated_at)
-        - Other expected differences
+        Returns whether they constitute a regression, the overall severity,
+        risk counts for unexpected differences and counts by diff type.
+        See _is_regression_diff for what counts as a regression; expected
+        differences (generated IDs, timestamps) never do.
         """
-        # Filter out expected differences
-        unexpected_diffs = [d for d in differences if not d.get("is_expected", False)]
-
-        if not unexpected_diffs:
-            return False
-
-        def _is_regression_diff(diff: Dict[str, Any]) -> bool:
-            """Decide whether a single diff should be treated as a regression.
-
-            Rules:
-            - Type mismatches are regressions.
-            - Fields removed in v2 (missing_in_v2) are regressions.
-            - Error statuses (v2_error, response_error, both_errors, v1_error) are regressions.
-            - Pure value mismatches where the types are the same (e.g., generated IDs, timestamps,
-              or other differing values) are NOT regressions.
-            - High severity diffs are regressions unless they are value-only with same types.
-            """
-            diff_type = diff.get("type", "")
-
-            # Always regress for these structural/problematic types
-            if diff_type in ["type_mismatch", "missing_in_v2", "response_error"]:
-                return True
-
-            # Any error-related diffs should be treated as regressions
-            if diff_type in ["v1_error", "v2_error", "both_errors"]:
-                return True
-
-            # Value mismatches: if both sides exist and have the same type, treat as non-regression
-            if diff_type == "value_mismatch":
-                v1_type = diff.get("v1_type") or (type(diff.get("v1_value")).__name__ if "v1_value" in diff else None)
-                v2_type = diff.get("v2_type") or (type(diff.get("v2_value")).__name__ if "v2_value" in diff else None)
-
-                # If both types are present and equal, this is a value-only difference -> not a regression
-                if v1_type and v2_type and v1_type == v2_type:
-                    return False
-
-                # If types differ or are missing, be conservative and treat as regression
-                return True
-
-            # Missing_in_v1 (new fields in v2) is usually not a regression
-            if diff_type == "missing_in_v1":
-                return False
-
-            # Otherwise, fall back to severity: high severity is a regression
-            if diff.get("severity") == "high":
-                return True
-
-            return False
-
-        # If any unexpected diff qualifies as a regression, return True
-        for d in unexpected_diffs:
-            if _is_regression_diff(d):
-                return True
-
-        return False
+        classifier = RegressionClassifier()
+        for diff in differences:
+            classifier.add(diff)
+        return classifier.verdict()
+    
+    @staticmethod
+    def detect_regressions(differences: List[Dict[str, Any]]) -> bool:
+        """Determine if differences constitute regressions (see classify)"""
+        return DiffEngine.classify(differences).is_regression
     
     @staticmethod
     def calculate_severity(differences: List[Dict[str, Any]]) -> str:
-        """Calculate overall regression severity based on unexpected differences only"""
-        # Filter out expected differences
-        unexpected_diffs = [d for d in differences if not d.get("is_expected", False)]
-
-        if not unexpected_diffs:
-            return "none"
-
-        # Reuse the same logic as detect_regressions to determine which diffs are true regressions
-        def _is_regression_diff(diff: Dict[str, Any]) -> bool:
-            diff_type = diff.get("type", "")
-
-            if diff_type in ["type_mismatch", "missing_in_v2", "response_error"]:
-                return True
-            if diff_type in ["v1_error", "v2_error", "both_errors"]:
-                return True
-            if diff_type == "value_mismatch":
-                v1_type = diff.get("v1_type") or (type(diff.get("v1_value")).__name__ if "v1_value" in diff else None)
-                v2_type = diff.get("v2_type") or (type(diff.get("v2_value")).__name__ if "v2_value" in diff else None)
-                if v1_type and v2_type and v1_type == v2_type:
-                    return False
-                return True
-            if diff_type == "missing_in_v1":
-                return False
-            if diff.get("severity") == "high":
-                return True
-            return False
-
-        regression_diffs = [d for d in unexpected_diffs if _is_regression_diff(d)]
-
-        if not regression_diffs:
-            return "none"
-
-        high_count = sum(1 for d in regression_diffs if d.get("severity") == "high")
-        medium_count = sum(1 for d in regression_diffs if d.get("severity") == "medium")
-
-        critical_types = ["missing_in_v2", "type_mismatch", "v2_error"]
-        critical_count = sum(1 for d in regression_diffs if d.get("type") in critical_types)
-
-        if critical_count > 0 or high_count > 0:
-            return "critical" if (critical_count > 2 or high_count > 3) else "high"
-        elif medium_count > 0:
-            return "medium" if medium_count > 3 else "low"
-        else:
-            return "low"
-
-
-
+        """Calculate overall regression severity based on unexpected differences only (see classify)"""
+        return DiffEngine.classify(differences).severity
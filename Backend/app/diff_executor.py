@@ -0,0 +1,92 @@
+import os
+import json
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.diff_engine import DiffEngine, DiffBudget, ExpectedDifferenceMatcher
+from app.models import DiffOptions
+from app.schema_fingerprint import SchemaPaths, schema_paths
+
+# Diffs whose two response bodies add up to at least this many bytes run in a
+# worker process instead of on the event loop; 0 keeps every diff inline
+DIFF_OFFLOAD_BYTES = int(os.getenv("DIFF_OFFLOAD_BYTES", "262144"))
+# Worker processes for offloaded diffs; 0 uses one per CPU
+DIFF_WORKERS = int(os.getenv("DIFF_WORKERS", "0"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def init_diff_pool() -> Optional[ProcessPoolExecutor]:
+    """Start the worker pool for large diffs (called from the app lifespan)"""
+    global _pool
+    if _pool is None and DIFF_OFFLOAD_BYTES > 0:
+        # Not fork: the pool starts inside the running app, whose threads (and
+        # their locks) a forked child would inherit mid-use and could deadlock on
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _pool = ProcessPoolExecutor(max_workers=DIFF_WORKERS or None, mp_context=multiprocessing.get_context(method))
+    return _pool
+
+
+def shutdown_diff_pool() -> None:
+    """Stop the worker pool, cancelling diffs that haven't started"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def diff_pool_for(size: int) -> Optional[ProcessPoolExecutor]:
+    """The worker pool, if a job over ``size`` bytes of response body should run there"""
+    return _pool if _pool is not None and size >= DIFF_OFFLOAD_BYTES else None
+
+
+def _schema_paths_of(v1_data: Any, v2_data: Any,
+                     schema_sides: Tuple[bool, bool]) -> Tuple[Optional[SchemaPaths], Optional[SchemaPaths]]:
+    return (schema_paths(v1_data) if schema_sides[0] else None,
+            schema_paths(v2_data) if schema_sides[1] else None)
+
+
+def _diff_bodies(v1_body: bytes, v2_body: bytes, options: Optional[DiffOptions],
+                 budget: Optional[DiffBudget], expected_patterns: Tuple[str, ...],
+                 schema_sides: Tuple[bool, bool] = (False, False)):
+    """Worker side: parse both raw bodies and diff them.
+
+    The bodies travel as bytes, which pickle far more cheaply than the
+    parsed trees; only the (budget-bounded) differences come back, plus
+    the schema paths of the sides ``schema_sides`` asks for.
+    """
+    if tuple(DiffEngine.EXPECTED_DIFFERENCE_PATTERNS) != expected_patterns:
+        # Patterns registered in the parent after this worker started
+        DiffEngine.EXPECTED_DIFFERENCE_PATTERNS = list(expected_patterns)
+        DiffEngine._expected_matcher = ExpectedDifferenceMatcher(DiffEngine.EXPECTED_DIFFERENCE_PATTERNS)
+    v1_data, v2_data = json.loads(v1_body), json.loads(v2_body)
+    differences = DiffEngine.deep_compare(v1_data, v2_data, options=options, budget=budget)
+    return differences, budget, _schema_paths_of(v1_data, v2_data, schema_sides)
+
+
+async def compare_responses(v1_data: Any, v2_data: Any, v1_body: Optional[bytes], v2_body: Optional[bytes],
+                            options: Optional[DiffOptions] = None, budget: Optional[DiffBudget] = None,
+                            schema_sides: Tuple[bool, bool] = (False, False)):
+    """Diff two parsed responses, in a worker process if their bodies are large.
+
+    Pass the raw bodies only when the parsed data came straight from them;
+    otherwise (or for small bodies) the diff runs inline. Returns the
+    differences, the budget with what the diff recorded in it, and the
+    (v1, v2) schema_paths for the sides ``schema_sides`` asks for (None for
+    the others), collected from the same parse as the diff.
+    """
+    pool = diff_pool_for(len(v1_body) + len(v2_body)) if v1_body is not None and v2_body is not None else None
+    if pool is not None:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                pool, _diff_bodies, v1_body, v2_body, options, budget,
+                tuple(DiffEngine.EXPECTED_DIFFERENCE_PATTERNS), schema_sides,
+            )
+        except BrokenProcessPool:
+            print("⚠️  Diff worker pool is broken - diffing inline")
+    differences = DiffEngine.deep_compare(v1_data, v2_data, options=options, budget=budget)
+    return differences, budget, _schema_paths_of(v1_data, v2_data, schema_sides)
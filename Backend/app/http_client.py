@@ -0,0 +1,163 @@
+import os
+import time
+import asyncio
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+# Connection pool settings for the shared client (see init_http_client)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+# Max in-flight requests per host; 0 disables the per-host cap
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "0"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "false").lower() in ("1", "true", "yes")
+
+_client: Optional[httpx.AsyncClient] = None
+_host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+
+def init_http_client() -> httpx.AsyncClient:
+    """Create the process-wide pooled AsyncClient (called from the app lifespan)"""
+    global _client
+    if _client is not None:
+        return _client
+
+    http2 = HTTP2_ENABLED
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            print("⚠️  HTTP2_ENABLED is set but the 'h2' package is missing - falling back to HTTP/1.1")
+            http2 = False
+
+    _client = httpx.AsyncClient(
+        http2=http2,
+        timeout=HTTP_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+    )
+    return _client
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the shared client, creating it on first use if the lifespan hook didn't"""
+    return _client if _client is not None else init_http_client()
+
+
+async def close_http_client() -> None:
+    """Close the shared client and drop its pooled connections"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    _host_semaphores.clear()
+
+
+def _host_semaphore(host: str) -> asyncio.Semaphore:
+    semaphore = _host_semaphores.get(host)
+    if semaphore is None:
+        semaphore = _host_semaphores[host] = asyncio.Semaphore(HTTP_MAX_CONNECTIONS_PER_HOST)
+    return semaphore
+
+
+@asynccontextmanager
+async def host_slot(url: str):
+    """Hold one of the per-host request slots for the duration of a request"""
+    if HTTP_MAX_CONNECTIONS_PER_HOST <= 0:
+        yield
+        return
+
+    async with _host_semaphore(urlsplit(url).netloc):
+        yield
+
+
+@asynccontextmanager
+async def host_slots(*urls: str):
+    """Hold per-host slots for requests that stay open together (a streamed v1/v2 pair).
+
+    One slot per distinct host, taken in a fixed order: with a slot per
+    request, two pairs could each hold one and wait forever for the other.
+    """
+    if HTTP_MAX_CONNECTIONS_PER_HOST <= 0:
+        yield
+        return
+
+    async with AsyncExitStack() as stack:
+        for host in sorted({urlsplit(url).netloc for url in urls}):
+            await stack.enter_async_context(_host_semaphore(host))
+        yield
+
+
+def _ms(start_ns: Optional[int], end_ns: Optional[int]) -> float:
+    if start_ns is None or end_ns is None:
+        return 0.0
+    return round((end_ns - start_ns) / 1_000_000, 3)
+
+
+class RequestTimer:
+    """Wall-clock timings for one request, split by phase.
+
+    Connection setup and time-to-first-byte come from the httpx ``trace``
+    extension; body download and JSON parsing are timed around aread() and
+    json(). A reused keep-alive connection reports a connect time of 0.
+    """
+
+    def __init__(self):
+        self.start_ns = time.perf_counter_ns()
+        self.events: Dict[str, int] = {}
+        self.headers_ns: Optional[int] = None
+        self.body_ns: Optional[int] = None
+        self.parse_ns: int = 0
+
+    async def trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        self.events[event_name] = time.perf_counter_ns()
+
+    def _phase(self, name: str) -> float:
+        return _ms(self.events.get(f"{name}.started"), self.events.get(f"{name}.complete"))
+
+    def parse_json(self, response: httpx.Response) -> Any:
+        started = time.perf_counter_ns()
+        try:
+            return response.json()
+        finally:
+            self.parse_ns += time.perf_counter_ns() - started
+
+    def as_dict(self) -> Dict[str, float]:
+        connect_ms = self._phase("connection.connect_tcp") + self._phase("connection.start_tls")
+        # First byte is measured from when the request headers start going out,
+        # so pool waits and connection setup aren't counted twice
+        sent_ns = next(
+            (self.events[k] for k in ("http11.send_request_headers.started", "http2.send_request_headers.started")
+             if k in self.events),
+            self.start_ns,
+        )
+        parse_ms = round(self.parse_ns / 1_000_000, 3)
+        end_ns = (self.body_ns or self.headers_ns or self.start_ns) + self.parse_ns
+        return {
+            "connect_ms": round(connect_ms, 3),
+            "ttfb_ms": _ms(sent_ns, self.headers_ns),
+            "download_ms": _ms(self.headers_ns, self.body_ns),
+            "parse_ms": parse_ms,
+            "total_ms": _ms(self.start_ns, end_ns),
+        }
+
+
+async def send_timed(client: httpx.AsyncClient, method: str, url: str, **kwargs) -> Tuple[httpx.Response, RequestTimer]:
+    """Send a request and read its body, recording per-phase timings"""
+    timer = RequestTimer()
+    request = client.build_request(method, url, extensions={"trace": timer.trace}, **kwargs)
+    response = await client.send(request, stream=True)
+    timer.headers_ns = time.perf_counter_ns()
+    try:
+        await response.aread()
+        timer.body_ns = time.perf_counter_ns()
+    finally:
+        await response.aclose()
+    return response, timer
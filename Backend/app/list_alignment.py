@@ -0,0 +1,238 @@
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+# Alignment ops, in the order their differences should be reported:
+#   (PAIR, i, j)    obj1[i] and obj2[j] are the same element - diff them
+#   (MOVED, i, j)   ...and it changed position relative to its neighbours
+#   (INSERTED, -1, j)  obj2[j] has no counterpart in v1
+#   (REMOVED, i, -1)   obj1[i] has no counterpart in v2
+PAIR = 0
+MOVED = 1
+INSERTED = 2
+REMOVED = 3
+
+Op = Tuple[int, int, int]
+
+_KEY_TYPES = (str, int, float, bool)
+
+
+def _moved_positions(v1_indices: List[int]) -> Set[int]:
+    """Positions (into v1_indices) that fall outside a longest increasing run.
+
+    Pairs on the longest increasing subsequence kept their relative order;
+    only the rest count as moved, so an insert at the head doesn't flag
+    every element after it.
+    """
+    tails: List[int] = []      # smallest tail value of an increasing run of each length
+    tail_pos: List[int] = []   # position of that tail
+    prev: List[int] = [-1] * len(v1_indices)
+    for pos, value in enumerate(v1_indices):
+        length = bisect_left(tails, value)
+        if length == len(tails):
+            tails.append(value)
+            tail_pos.append(pos)
+        else:
+            tails[length] = value
+            tail_pos[length] = pos
+        prev[pos] = tail_pos[length - 1] if length else -1
+
+    keep = set()
+    pos = tail_pos[-1] if tail_pos else -1
+    while pos != -1:
+        keep.add(pos)
+        pos = prev[pos]
+    return {pos for pos in range(len(v1_indices)) if pos not in keep}
+
+
+def align_by_key(list1: Sequence[Any], list2: Sequence[Any], key: str) -> List[Op]:
+    """Pair list elements by a key field such as ``id``.
+
+    Elements without a usable key (not a dict, key missing or not a scalar,
+    or a repeated key) are paired with each other by position.
+    """
+    def keyed_index(items: Sequence[Any]) -> Tuple[Dict[Any, int], List[int]]:
+        by_key: Dict[Any, int] = {}
+        unkeyed: List[int] = []
+        for index, item in enumerate(items):
+            if isinstance(item, dict) and isinstance(item.get(key), _KEY_TYPES) and item[key] not in by_key:
+                by_key[item[key]] = index
+            else:
+                unkeyed.append(index)
+        return by_key, unkeyed
+
+    v1_by_key, v1_unkeyed = keyed_index(list1)
+    v2_by_key, v2_unkeyed = keyed_index(list2)
+    v2_unkeyed_set = set(v2_unkeyed)
+
+    pairs: List[Tuple[int, int]] = []
+    inserted: List[int] = []
+    next_unkeyed = 0
+    for j, item in enumerate(list2):
+        if j in v2_unkeyed_set:
+            if next_unkeyed < len(v1_unkeyed):
+                pairs.append((v1_unkeyed[next_unkeyed], j))
+                next_unkeyed += 1
+            else:
+                inserted.append(j)
+        elif item[key] in v1_by_key:
+            pairs.append((v1_by_key[item[key]], j))
+        else:
+            inserted.append(j)
+
+    paired_v1 = {i for i, _ in pairs}
+    moved = _moved_positions([i for i, _ in pairs])
+
+    ops: List[Op] = []
+    inserted_set = set(inserted)
+    pair_iter = iter(enumerate(pairs))
+    for j in range(len(list2)):
+        if j in inserted_set:
+            ops.append((INSERTED, -1, j))
+            continue
+        pos, (i, _) = next(pair_iter)
+        if pos in moved:
+            ops.append((MOVED, i, j))
+        ops.append((PAIR, i, j))
+    ops.extend((REMOVED, i, -1) for i in range(len(list1)) if i not in paired_v1)
+    return ops
+
+
+# Give up searching a range once its edit script needs more than this many
+# steps per direction; the range is then paired by position instead
+LCS_MAX_COST = 1024
+
+
+def _middle_snake(a: Sequence[int], a0: int, n: int, b: Sequence[int], b0: int, m: int,
+                  max_cost: int) -> Optional[Tuple[int, int, int, int]]:
+    """Find the middle snake of a[a0:a0+n] vs b[b0:b0+m] (Myers 1986, section 4b).
+
+    Returns (x, y, u, v) in local coordinates: the snake runs from (x, y)
+    to (u, v) and splits the edit script into two halves. Returns None if
+    the two ranges are too different to search within ``max_cost``.
+    """
+    delta = n - m
+    odd = delta & 1
+    max_d = min((n + m + 1) // 2, max_cost)
+    offset = max_d + abs(delta) + 2
+    forward = [0] * (2 * offset + 1)
+    backward = [0] * (2 * offset + 1)
+    forward[offset + 1] = 0
+    backward[offset + delta - 1] = n
+
+    for d in range(max_d + 1):
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and forward[offset + k - 1] < forward[offset + k + 1]):
+                x = forward[offset + k + 1]
+            else:
+                x = forward[offset + k - 1] + 1
+            y = x - k
+            x_start, y_start = x, y
+            while x < n and y < m and a[a0 + x] == b[b0 + y]:
+                x += 1
+                y += 1
+            forward[offset + k] = x
+            if odd and delta - (d - 1) <= k <= delta + (d - 1) and x >= backward[offset + k]:
+                return x_start, y_start, x, y
+
+        for k in range(-d, d + 1, 2):
+            kk = k + delta
+            if k == d or (k != -d and backward[offset + kk - 1] < backward[offset + kk + 1]):
+                x = backward[offset + kk - 1]
+            else:
+                x = backward[offset + kk + 1] - 1
+            y = x - kk
+            x_end, y_end = x, y
+            while x > 0 and y > 0 and a[a0 + x - 1] == b[b0 + y - 1]:
+                x -= 1
+                y -= 1
+            backward[offset + kk] = x
+            if not odd and -d <= kk <= d and x <= forward[offset + kk]:
+                return x, y, x_end, y_end
+
+    return None
+
+
+def lcs_matches(a: Sequence[int], b: Sequence[int], max_cost: int = LCS_MAX_COST) -> List[Tuple[int, int]]:
+    """Index pairs of a longest common subsequence, via linear-space Myers diff.
+
+    Ranges that would cost more than ``max_cost`` steps to search are left
+    unmatched, so the result can be shorter than the true LCS on very
+    different inputs.
+    """
+    matches: List[Tuple[int, int]] = []
+    ranges = [(0, len(a), 0, len(b))]
+    while ranges:
+        a0, a1, b0, b1 = ranges.pop()
+        # Common prefix and suffix need no search
+        while a0 < a1 and b0 < b1 and a[a0] == b[b0]:
+            matches.append((a0, b0))
+            a0 += 1
+            b0 += 1
+        while a0 < a1 and b0 < b1 and a[a1 - 1] == b[b1 - 1]:
+            a1 -= 1
+            b1 -= 1
+            matches.append((a1, b1))
+        if a0 == a1 or b0 == b1:
+            continue
+
+        snake = _middle_snake(a, a0, a1 - a0, b, b0, b1 - b0, max_cost)
+        if snake is None:
+            continue
+        x, y, u, v = snake
+        matches.extend((a0 + x + step, b0 + y + step) for step in range(u - x))
+        ranges.append((a0, a0 + x, b0, b0 + y))
+        ranges.append((a0 + u, a1, b0 + v, b1))
+    matches.sort()
+    return matches
+
+
+def align_by_content(hashes1: Sequence[int], hashes2: Sequence[int]) -> List[Op]:
+    """Pair list elements by content hash along a longest common subsequence.
+
+    Within each gap between matched runs, leftover elements are paired by
+    position (so an edited element is diffed field by field rather than
+    reported as removed + inserted); any excess is removed or inserted.
+    """
+    ops: List[Op] = []
+    prev_i = prev_j = 0
+    for i, j in lcs_matches(hashes1, hashes2) + [(len(hashes1), len(hashes2))]:
+        gap1 = range(prev_i, i)
+        gap2 = range(prev_j, j)
+        paired = min(len(gap1), len(gap2))
+        ops.extend((PAIR, gap1[k], gap2[k]) for k in range(paired))
+        ops.extend((REMOVED, gap1[k], -1) for k in range(paired, len(gap1)))
+        ops.extend((INSERTED, -1, gap2[k]) for k in range(paired, len(gap2)))
+        if i < len(hashes1):
+            ops.append((PAIR, i, j))
+        prev_i, prev_j = i + 1, j + 1
+    return ops
+
+
+def align_unordered(hashes1: Sequence[int], hashes2: Sequence[int],
+                    same: Optional[Callable[[int, int], bool]] = None) -> List[Op]:
+    """Match list elements as multisets of content hashes, ignoring order.
+
+    Runs in O(n): each v1 element consumes an equal v2 element if one is
+    left. Only the leftovers are reported - removals first, then inserts.
+    Hashes can collide, so when ``same(i, j)`` is given a candidate with
+    an equal hash is only consumed once it confirms the two really match.
+    """
+    available: Dict[int, List[int]] = {}
+    for j in range(len(hashes2) - 1, -1, -1):
+        available.setdefault(hashes2[j], []).append(j)
+
+    ops: List[Op] = []
+    for i, element_hash in enumerate(hashes1):
+        candidates = available.get(element_hash)
+        if candidates and same is None:
+            candidates.pop()
+            continue
+        for position in range(len(candidates) - 1, -1, -1) if candidates else ():
+            if same(i, candidates[position]):
+                del candidates[position]
+                break
+        else:
+            ops.append((REMOVED, i, -1))
+    leftover = sorted(j for candidates in available.values() for j in candidates)
+    ops.extend((INSERTED, -1, j) for j in leftover)
+    return ops
@@ -7,6 +7,8 @@ from dotenv import load_dotenv
 
 from app.routers import api_v1, api_v2, comparison, ai, auth
 from app.database import init_db
+from app.http_client import init_http_client, close_http_client
+from app.diff_executor import init_diff_pool, shutdown_diff_pool
 
 # Load .env from root directory
 import pathlib
@@ -20,9 +22,12 @@ security = HTTPBearer()
 async def lifespan(app: FastAPI):
     # Startup
     init_db()
+    init_http_client()
+    init_diff_pool()
     yield
     # Shutdown
-    pass
+    await close_http_client()
+    shutdown_diff_pool()
 
 app = FastAPI(
     title="SentinelTwin API",
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional, Dict, Any, List
+from pydantic import BaseModel, ConfigDict
+from typing import Optional, Dict, Any, List, Literal, Tuple
 from datetime import datetime
 from enum import Enum
 
@@ -9,6 +9,43 @@ class EndpointType(str, Enum):
     UPDATE = "update"
     DELETE = "delete"
 
+class NumericTolerance(BaseModel):
+    """Numbers within abs_tolerance or rel_tolerance of each other compare as equal (see math.isclose)"""
+    model_config = ConfigDict(frozen=True)
+    
+    # Apply to one path ("[*]" for list indexes, e.g. "items[*].price"), or to
+    # one number type ("int" when both sides are ints, else "float"); with
+    # neither, to every number. A path rule beats a type rule beats a general one
+    path: Optional[str] = None
+    type: Optional[Literal["int", "float"]] = None
+    abs_tolerance: float = 0.0
+    rel_tolerance: float = 0.0
+
+class DiffOptions(BaseModel):
+    """Tuning knobs for DiffEngine.deep_compare (hashable, so usable as a cache key)"""
+    model_config = ConfigDict(frozen=True)
+    
+    # How list elements are paired: "index" (by position), "key" (by list_key field,
+    # reporting moved elements) or "lcs" (by content, via a Myers diff)
+    list_alignment: Literal["index", "key", "lcs"] = "index"
+    list_key: str = "id"
+    # Lists compared as multisets (order ignored), by path with "[*]" for indexes,
+    # e.g. "items" or "items[*].tags"
+    unordered_paths: Tuple[str, ...] = ()
+    # Diff budget: stop after this many differences, don't descend below this
+    # depth, and stop once embedded v1/v2 values reach this many bytes.
+    # None uses the server default, 0 means no limit
+    max_differences: Optional[int] = None
+    max_depth: Optional[int] = None
+    max_value_bytes: Optional[int] = None
+    # Compact output: differences carry a JSON pointer into v1_response/v2_response
+    # instead of a dotted path, plus value types; values are only inlined when
+    # their JSON encoding is at most compact_value_bytes
+    compact: bool = False
+    compact_value_bytes: int = 256
+    # Numeric tolerances; booleans are never treated as numbers
+    numeric_tolerances: Tuple[NumericTolerance, ...] = ()
+
 class ComparisonRequest(BaseModel):
     endpoint: str
     method: str
@@ -16,6 +53,53 @@ class ComparisonRequest(BaseModel):
     params: Optional[Dict[str, Any]] = None
     v1_version: Optional[str] = "v1"
     v2_version: Optional[str] = "v2"
+    # Send the v1 and v2 requests together instead of one after the other
+    concurrent: Optional[bool] = True
+    # Per-side timeout in seconds (defaults to COMPARISON_REQUEST_TIMEOUT)
+    timeout_s: Optional[float] = None
+    # v2/v1 latency ratio above which v2 is flagged as slower (defaults to LATENCY_REGRESSION_THRESHOLD)
+    latency_regression_threshold: Optional[float] = None
+    diff_options: Optional[DiffOptions] = None
+
+class PagedComparisonRequest(BaseModel):
+    """Compare a cursor-paginated collection (e.g. /get?limit=&cursor=) one page at a time"""
+    endpoint: str = "/get"
+    # Extra query parameters for every page, e.g. {"status": "active", "fields": "name,value"}
+    params: Optional[Dict[str, Any]] = None
+    v1_version: Optional[str] = "v1"
+    v2_version: Optional[str] = "v2"
+    # Items fetched per page from each side
+    page_size: int = 100
+    timeout_s: Optional[float] = None
+    diff_options: Optional[DiffOptions] = None
+
+class BulkCreateRequest(BaseModel):
+    """Items for /bulk/create, each shaped like a /create body"""
+    items: List[Dict[str, Any]]
+    # Items written per round trip (defaults to BULK_CHUNK_SIZE)
+    chunk_size: Optional[int] = None
+
+class BulkUpdateRequest(BaseModel):
+    """Changes for /bulk/update, each an item's "id" plus the fields to change"""
+    items: List[Dict[str, Any]]
+    chunk_size: Optional[int] = None
+
+class BulkDeleteRequest(BaseModel):
+    ids: List[str]
+    chunk_size: Optional[int] = None
+
+class RequestTimings(BaseModel):
+    connect_ms: float = 0.0
+    ttfb_ms: float = 0.0
+    download_ms: float = 0.0
+    parse_ms: float = 0.0
+    total_ms: float = 0.0
+
+class RegressionVerdict(BaseModel):
+    is_regression: bool
+    severity: str  # none, low, medium, high, critical
+    risk_counts: Dict[str, int]  # unexpected differences by risk level (low/medium/high)
+    counts_by_type: Dict[str, int]  # all differences by type
 
 class ComparisonResult(BaseModel):
     endpoint: str
@@ -28,6 +112,37 @@ class ComparisonResult(BaseModel):
     timestamp: datetime
     v1_request_time_ms: Optional[float] = None
     v2_request_time_ms: Optional[float] = None
+    v1_timings: Optional[RequestTimings] = None
+    v2_timings: Optional[RequestTimings] = None
+    is_latency_regression: bool = False
+    latency_ratio: Optional[float] = None
+    risk_counts: Optional[Dict[str, int]] = None
+    counts_by_type: Optional[Dict[str, int]] = None
+    # Set when the diff budget was hit; diff_summary then has per-subtree counts
+    # of reported differences and of subtrees that were never compared
+    diff_truncated: bool = False
+    diff_truncation_reason: Optional[str] = None
+    diff_summary: Optional[Dict[str, Dict[str, int]]] = None
+    # Structural fingerprints of the two responses (None for a failed side);
+    # schema_changed compares them, without looking at the differences
+    v1_schema_fingerprint: Optional[str] = None
+    v2_schema_fingerprint: Optional[str] = None
+    schema_changed: Optional[bool] = None
+
+class CompareAllRequest(BaseModel):
+    # Endpoints to compare; defaults to the built-in CRUD suite
+    endpoints: Optional[List[ComparisonRequest]] = None
+    # Max comparisons in flight at once (defaults to COMPARE_CONCURRENCY)
+    concurrency: Optional[int] = None
+
+class ResponsePair(BaseModel):
+    v1_response: Any = None
+    v2_response: Any = None
+
+class BatchDiffRequest(BaseModel):
+    # Recorded response pairs to diff, e.g. from replaying captured requests
+    pairs: List[ResponsePair]
+    diff_options: Optional[DiffOptions] = None
 
 class RegressionSummary(BaseModel):
     total_endpoints_tested: int
@@ -78,6 +193,14 @@ class TestCase(BaseModel):
     role: Optional[str] = "user"  # user, admin, etc.
     failure_reason: Optional[str] = None
 
+class BatchTestRunRequest(BaseModel):
+    test_cases: List[TestCase]
+    role: Optional[str] = "user"
+    v1_version: Optional[str] = "v1"
+    v2_version: Optional[str] = "v2"
+    # Max test cases in flight at once (defaults to COMPARE_CONCURRENCY)
+    concurrency: Optional[int] = None
+
 class TestCaseGenerationRequest(BaseModel):
     service_description: str
     # Optional: request a specific number of test cases (default: 5)
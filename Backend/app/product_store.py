@@ -0,0 +1,766 @@
+import os
+import re
+import json
+import bisect
+import base64
+import sqlite3
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from app.database import get_supabase
+from app.storage import execute, run_sync
+
+# Backend for the v1/v2 products tables: "supabase", "memory" or "sqlite".
+# Unset picks Supabase when it is configured and memory otherwise
+PRODUCT_STORE = os.getenv("PRODUCT_STORE", "").lower()
+# Database file for the sqlite backend (created if missing)
+PRODUCT_STORE_SQLITE_PATH = os.getenv("PRODUCT_STORE_SQLITE_PATH", "products.db")
+# Page size for list requests that pass a cursor but no limit, and the largest limit allowed
+PRODUCT_PAGE_SIZE = int(os.getenv("PRODUCT_PAGE_SIZE", "100"))
+PRODUCT_PAGE_MAX = int(os.getenv("PRODUCT_PAGE_MAX", "1000"))
+# Items written per round trip by the /bulk endpoints when the request doesn't say,
+# and the largest chunk a request may ask for
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "1000"))
+BULK_CHUNK_MAX = int(os.getenv("BULK_CHUNK_MAX", "10000"))
+# Ids per Supabase "id=in.(...)" filter, which travels in the URL and so can't grow with the chunk
+SUPABASE_ID_FILTER_SIZE = 200
+
+# A (created_at, id) keyset position; rows are listed in this order
+PageKey = Tuple[str, str]
+
+
+class PartialWriteError(Exception):
+    """A batch write made of several calls, some of which failed.
+
+    ``written`` has the rows that did go through, by id, and ``failed`` the
+    error for each id that didn't.
+    """
+
+    def __init__(self, written: Dict[str, Dict[str, Any]], failed: Dict[str, str]):
+        super().__init__(f"{len(failed)} item(s) not written: {next(iter(failed.values()))}")
+        self.written = written
+        self.failed = failed
+
+
+class ProductStore(ABC):
+    """One version's products table. Every method returns plain row dicts.
+
+    get, update and delete return None when the item doesn't exist. A
+    backend has to implement every abstract method to be constructed.
+    """
+
+    @abstractmethod
+    async def insert(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        ...
+
+    @abstractmethod
+    async def get(self, item_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def list(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """All items (only those with ``status``, if given), oldest first"""
+        ...
+
+    @abstractmethod
+    async def page(self, after: Optional[PageKey], limit: int, status: Optional[str] = None,
+                   fields: Optional[List[str]] = None) -> List[Tuple[PageKey, Dict[str, Any]]]:
+        """Up to ``limit`` items past the ``after`` key, in list order, cut down to ``fields``.
+        
+        Each item comes with its own key, to continue from.
+        """
+        ...
+
+    @abstractmethod
+    async def count(self, status: Optional[str] = None) -> int:
+        """Number of items (with ``status``, if given), without loading them"""
+        ...
+
+    @abstractmethod
+    async def update(self, item_id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Merge ``data`` into an item and return the updated item"""
+        ...
+
+    @abstractmethod
+    async def delete(self, item_id: str) -> Optional[Dict[str, Any]]:
+        """Remove an item and return it as it was"""
+        ...
+
+    # Batch writes, used by the /bulk endpoints through bulk_insert, bulk_update
+    # and bulk_delete. Unlike the single-item methods they raise when the write
+    # fails, so the caller can report which items didn't make it; a store whose
+    # batch takes several calls raises PartialWriteError if only some fail.
+    # These defaults just loop; stores with a cheaper batch path override them.
+
+    async def insert_many(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert a batch of items and return them, in order"""
+        return [await self.insert(item) for item in items]
+
+    async def update_many(self, changes: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Apply a batch of updates, each the item's "id" plus the fields to merge in.
+
+        Returns the updated items by id; ids that don't exist are left out.
+        """
+        updated: Dict[str, Dict[str, Any]] = {}
+        for change in changes:
+            item = await self.update(change["id"], _without_id(change))
+            if item is not None:
+                updated[item["id"]] = item
+        return updated
+
+    async def delete_many(self, item_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Remove a batch of items and return them by id, as they were; missing ids are left out"""
+        deleted: Dict[str, Dict[str, Any]] = {}
+        for item_id in item_ids:
+            item = await self.delete(item_id)
+            if item is not None:
+                deleted[item_id] = item
+        return deleted
+
+
+def _without_id(data: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in data.items() if key != "id"}
+
+
+def _created_key(item: Dict[str, Any]) -> PageKey:
+    return str(item.get("created_at") or ""), str(item["id"])
+
+
+def _project(item: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+    if fields is None:
+        return item
+    return {field: item[field] for field in fields if field in item}
+
+
+class MemoryProductStore(ProductStore):
+    """In-process store, indexed by status and by (created_at, id)"""
+
+    def __init__(self):
+        self._items: Dict[str, Dict[str, Any]] = {}
+        self._by_status: Dict[Any, Set[str]] = {}
+        # Sorted (created_at, id) keys, for listing in creation order
+        self._by_created: List[Tuple[str, str]] = []
+
+    def _index(self, item: Dict[str, Any]) -> None:
+        self._by_status.setdefault(item.get("status"), set()).add(item["id"])
+        bisect.insort(self._by_created, _created_key(item))
+
+    def _unindex(self, item: Dict[str, Any]) -> None:
+        ids = self._by_status.get(item.get("status"))
+        if ids is not None:
+            ids.discard(item["id"])
+            if not ids:
+                del self._by_status[item.get("status")]
+        key = _created_key(item)
+        position = bisect.bisect_left(self._by_created, key)
+        if position < len(self._by_created) and self._by_created[position] == key:
+            del self._by_created[position]
+
+    async def insert(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        existing = self._items.get(item["id"])
+        if existing is not None:
+            self._unindex(existing)
+        self._items[item["id"]] = item
+        self._index(item)
+        return item
+
+    async def get(self, item_id: str) -> Optional[Dict[str, Any]]:
+        return self._items.get(item_id)
+
+    async def list(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        items = self._items
+        if status is None:
+            return [items[item_id] for _, item_id in self._by_created]
+        ids = self._by_status.get(status)
+        if not ids:
+            return []
+        return [items[item_id] for item_id in sorted(ids, key=lambda item_id: _created_key(items[item_id]))]
+
+    async def page(self, after: Optional[PageKey], limit: int, status: Optional[str] = None,
+                   fields: Optional[List[str]] = None) -> List[Tuple[PageKey, Dict[str, Any]]]:
+        keys = self._by_created
+        position = bisect.bisect_right(keys, after) if after is not None else 0
+        page: List[Tuple[PageKey, Dict[str, Any]]] = []
+        while position < len(keys) and len(page) < limit:
+            key = keys[position]
+            position += 1
+            item = self._items[key[1]]
+            if status is None or item.get("status") == status:
+                page.append((key, _project(item, fields)))
+        return page
+
+    async def count(self, status: Optional[str] = None) -> int:
+        if status is None:
+            return len(self._items)
+        return len(self._by_status.get(status, ()))
+
+    async def update(self, item_id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        item = self._items.get(item_id)
+        if item is None:
+            return None
+        reindex = "status" in data or "created_at" in data or "id" in data
+        if reindex:
+            self._unindex(item)
+        item.update(data)
+        item["id"] = item_id
+        if reindex:
+            self._index(item)
+        return item
+
+    async def delete(self, item_id: str) -> Optional[Dict[str, Any]]:
+        item = self._items.pop(item_id, None)
+        if item is not None:
+            self._unindex(item)
+        return item
+
+
+class SupabaseProductStore(ProductStore):
+    """A Supabase table, falling back to an in-memory store when a query fails"""
+
+    def __init__(self, client: Any, table: str):
+        self._client = client
+        self._table_name = table
+        self._fallback = MemoryProductStore()
+
+    def _table(self):
+        return self._client.table(self._table_name)
+
+    async def insert(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            response = await execute(self._table().insert(item))
+            return response.data[0] if response.data else item
+        except Exception as e:
+            print(f"⚠️  Supabase insert error: {e}")
+            return await self._fallback.insert(item)
+
+    async def get(self, item_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            response = await execute(self._table().select("*").eq("id", item_id))
+            return response.data[0] if response.data else None
+        except Exception as e:
+            print(f"⚠️  Supabase query error: {e}")
+            return await self._fallback.get(item_id)
+
+    async def list(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        try:
+            query = self._table().select("*")
+            if status is not None:
+                query = query.eq("status", status)
+            response = await execute(query.order("created_at").order("id"))
+            return response.data or []
+        except Exception as e:
+            print(f"⚠️  Supabase query error: {e}")
+            return await self._fallback.list(status)
+
+    async def page(self, after: Optional[PageKey], limit: int, status: Optional[str] = None,
+                   fields: Optional[List[str]] = None) -> List[Tuple[PageKey, Dict[str, Any]]]:
+        try:
+            # The keyset columns are always selected, to build the next cursor from
+            columns = "*" if fields is None else ",".join(dict.fromkeys([*fields, "created_at", "id"]))
+            query = self._table().select(columns)
+            if status is not None:
+                query = query.eq("status", status)
+            if after is not None:
+                created_at, item_id = after
+                query = query.or_(f'created_at.gt."{created_at}",'
+                                  f'and(created_at.eq."{created_at}",id.gt."{item_id}")')
+            response = await execute(query.order("created_at").order("id").limit(limit))
+            return [(_created_key(row), _project(row, fields)) for row in response.data or []]
+        except Exception as e:
+            print(f"⚠️  Supabase query error: {e}")
+            return await self._fallback.page(after, limit, status, fields)
+
+    async def count(self, status: Optional[str] = None) -> int:
+        try:
+            query = self._table().select("id", count="exact", head=True)
+            if status is not None:
+                query = query.eq("status", status)
+            response = await execute(query)
+            return response.count or 0
+        except Exception as e:
+            print(f"⚠️  Supabase query error: {e}")
+            return await self._fallback.count(status)
+
+    # update and delete return the affected rows (PostgREST's return=representation),
+    # so no matching row comes back as an empty result instead of needing a lookup first
+
+    async def update(self, item_id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        try:
+            # Like the other stores, never move an item to another id
+            response = await execute(self._table().update(_without_id(data)).eq("id", item_id))
+            return response.data[0] if response.data else None
+        except Exception as e:
+            print(f"⚠️  Supabase update error: {e}")
+            return await self._fallback.update(item_id, data)
+
+    async def delete(self, item_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            response = await execute(self._table().delete().eq("id", item_id))
+            return response.data[0] if response.data else None
+        except Exception as e:
+            print(f"⚠️  Supabase delete error: {e}")
+            return await self._fallback.delete(item_id)
+
+    # Batch writes don't fall back to memory: a failed chunk is reported instead
+
+    async def insert_many(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        response = await execute(self._table().insert(items))
+        return response.data or items
+
+    async def update_many(self, changes: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        # PostgREST applies one set of changes per update, so items getting the
+        # same changes share an update ... where id in (...); each is a single
+        # statement, so missing items stay missing and concurrent updates to
+        # other fields aren't overwritten. An id changed twice starts a new
+        # round so its changes land in order
+        updated: Dict[str, Dict[str, Any]] = {}
+        rounds: List[Dict[str, Tuple[Dict[str, Any], List[str]]]] = [{}]
+        seen: Set[str] = set()
+        for change in changes:
+            if change["id"] in seen:
+                rounds.append({})
+                seen = set()
+            seen.add(change["id"])
+            data = _without_id(change)
+            group = rounds[-1].setdefault(json.dumps(data, sort_keys=True, default=str), (data, []))
+            group[1].append(change["id"])
+
+        # The calls aren't one transaction, so a failed one doesn't undo the others
+        failed: Dict[str, str] = {}
+        for groups in rounds:
+            for data, item_ids in groups.values():
+                for start in range(0, len(item_ids), SUPABASE_ID_FILTER_SIZE):
+                    batch = item_ids[start:start + SUPABASE_ID_FILTER_SIZE]
+                    try:
+                        response = await execute(self._table().update(data).in_("id", batch))
+                    except Exception as e:
+                        failed.update((item_id, str(e)) for item_id in batch)
+                        continue
+                    updated.update((row["id"], row) for row in response.data or [])
+        if failed:
+            raise PartialWriteError(updated, failed)
+        return updated
+
+    async def delete_many(self, item_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        deleted: Dict[str, Dict[str, Any]] = {}
+        unique_ids = list(dict.fromkeys(item_ids))
+        failed: Dict[str, str] = {}
+        for start in range(0, len(unique_ids), SUPABASE_ID_FILTER_SIZE):
+            batch = unique_ids[start:start + SUPABASE_ID_FILTER_SIZE]
+            try:
+                response = await execute(self._table().delete().in_("id", batch))
+            except Exception as e:
+                failed.update((item_id, str(e)) for item_id in batch)
+                continue
+            deleted.update((row["id"], row) for row in response.data or [])
+        if failed:
+            raise PartialWriteError(deleted, failed)
+        return deleted
+
+
+def _merge_item(data: str, changes: str) -> str:
+    item = json.loads(data)
+    item.update(json.loads(changes))
+    return json.dumps(item)
+
+
+class SQLiteProductStore(ProductStore):
+    """A table in a local SQLite database in WAL mode, for offline benchmarks and load tests.
+
+    Items are stored as JSON, with id, created_at and status copied into
+    indexed columns. Calls run in worker threads over one shared connection.
+    Updates and deletes are single statements using RETURNING (SQLite 3.35+).
+    """
+
+    def __init__(self, path: str, table: str):
+        self._table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        # Merges an update into the stored JSON inside the UPDATE itself, with dict.update semantics
+        self._conn.create_function("merge_item", 2, _merge_item, deterministic=True)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} "
+                "(id TEXT PRIMARY KEY, created_at TEXT, status TEXT, data TEXT NOT NULL)"
+            )
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_created_at ON {table}(created_at, id)")
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_status ON {table}(status)")
+
+    @staticmethod
+    def _columns(item: Dict[str, Any]) -> Tuple[str, str, Any, str]:
+        created_at, item_id = _created_key(item)
+        return item_id, created_at, item.get("status"), json.dumps(item)
+
+    def _insert_sync(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self._conn.execute(f"INSERT OR REPLACE INTO {self._table} VALUES (?, ?, ?, ?)", self._columns(item))
+        return item
+
+    def _get_sync(self, item_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT data FROM {self._table} WHERE id = ?", (item_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _list_sync(self, status: Optional[str]) -> List[Dict[str, Any]]:
+        query = f"SELECT data FROM {self._table}"
+        params: Tuple[Any, ...] = ()
+        if status is not None:
+            query += " WHERE status = ?"
+            params = (status,)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY created_at, id", params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def _page_sync(self, after: Optional[PageKey], limit: int, status: Optional[str],
+                   fields: Optional[List[str]]) -> List[Tuple[PageKey, Dict[str, Any]]]:
+        conditions = []
+        params: List[Any] = []
+        if status is not None:
+            conditions.append("status = ?")
+            params.append(status)
+        if after is not None:
+            # Row-value comparison, so the (created_at, id) index serves the seek
+            conditions.append("(created_at, id) > (?, ?)")
+            params.extend(after)
+        query = f"SELECT created_at, id, data FROM {self._table}"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY created_at, id LIMIT ?", (*params, limit)).fetchall()
+        return [((row[0], row[1]), _project(json.loads(row[2]), fields)) for row in rows]
+
+    def _count_sync(self, status: Optional[str]) -> int:
+        with self._lock:
+            if status is None:
+                return self._conn.execute(f"SELECT COUNT(*) FROM {self._table}").fetchone()[0]
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self._table} WHERE status = ?", (status,)).fetchone()[0]
+
+    def _update_statement(self, item_id: str, data: Dict[str, Any]) -> Tuple[str, List[Any]]:
+        data = _without_id(data)
+        assignments = ["data = merge_item(data, ?)"]
+        params: List[Any] = [json.dumps(data)]
+        if "created_at" in data:
+            assignments.append("created_at = ?")
+            params.append(str(data["created_at"] or ""))
+        if "status" in data:
+            assignments.append("status = ?")
+            params.append(data["status"])
+        params.append(item_id)
+        return f"UPDATE {self._table} SET {', '.join(assignments)} WHERE id = ? RETURNING data", params
+
+    def _update_sync(self, item_id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        query, params = self._update_statement(item_id, data)
+        with self._lock:
+            row = self._conn.execute(query, params).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _delete_sync(self, item_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(f"DELETE FROM {self._table} WHERE id = ? RETURNING data", (item_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    # Each batch is one transaction, so it costs one commit instead of one per
+    # item and either lands whole or not at all
+
+    def _in_transaction(self, write: Callable[[], Any]) -> Any:
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                result = write()
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return result
+
+    def _insert_many_sync(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        rows = [self._columns(item) for item in items]
+        self._in_transaction(
+            lambda: self._conn.executemany(f"INSERT OR REPLACE INTO {self._table} VALUES (?, ?, ?, ?)", rows)
+        )
+        return items
+
+    def _update_many_sync(self, changes: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        statements = [self._update_statement(change["id"], change) for change in changes]
+
+        def write() -> Dict[str, Dict[str, Any]]:
+            updated: Dict[str, Dict[str, Any]] = {}
+            for query, params in statements:
+                row = self._conn.execute(query, params).fetchone()
+                if row:
+                    item = json.loads(row[0])
+                    updated[item["id"]] = item
+            return updated
+
+        return self._in_transaction(write)
+
+    def _delete_many_sync(self, item_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        unique_ids = list(dict.fromkeys(item_ids))
+        placeholders = ", ".join("?" * len(unique_ids))
+        rows = self._in_transaction(
+            lambda: self._conn.execute(
+                f"DELETE FROM {self._table} WHERE id IN ({placeholders}) RETURNING data", unique_ids
+            ).fetchall()
+        )
+        deleted = (json.loads(row[0]) for row in rows)
+        return {item["id"]: item for item in deleted}
+
+    async def insert(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        return await run_sync(self._insert_sync, item)
+
+    async def get(self, item_id: str) -> Optional[Dict[str, Any]]:
+        return await run_sync(self._get_sync, item_id)
+
+    async def list(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        return await run_sync(self._list_sync, status)
+
+    async def page(self, after: Optional[PageKey], limit: int, status: Optional[str] = None,
+                   fields: Optional[List[str]] = None) -> List[Tuple[PageKey, Dict[str, Any]]]:
+        return await run_sync(self._page_sync, after, limit, status, fields)
+
+    async def count(self, status: Optional[str] = None) -> int:
+        return await run_sync(self._count_sync, status)
+
+    async def update(self, item_id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return await run_sync(self._update_sync, item_id, data)
+
+    async def delete(self, item_id: str) -> Optional[Dict[str, Any]]:
+        return await run_sync(self._delete_sync, item_id)
+
+    async def insert_many(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return await run_sync(self._insert_many_sync, items)
+
+    async def update_many(self, changes: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        return await run_sync(self._update_many_sync, changes)
+
+    async def delete_many(self, item_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        return await run_sync(self._delete_many_sync, item_ids)
+
+
+_stores: Dict[str, ProductStore] = {}
+
+
+def _create_store(table: str) -> ProductStore:
+    backend = PRODUCT_STORE or ("supabase" if get_supabase() else "memory")
+    if backend == "sqlite":
+        return SQLiteProductStore(PRODUCT_STORE_SQLITE_PATH, table)
+    if backend == "supabase":
+        client = get_supabase()
+        if client:
+            return SupabaseProductStore(client, table)
+        print("⚠️  PRODUCT_STORE is 'supabase' but Supabase is not configured - using in-memory storage")
+    elif backend != "memory":
+        print(f"⚠️  Unknown PRODUCT_STORE '{backend}' - using in-memory storage")
+    return MemoryProductStore()
+
+
+def get_product_store(version: str) -> ProductStore:
+    """The products store for an API version ("v1" or "v2"), created on first use"""
+    store = _stores.get(version)
+    if store is None:
+        store = _stores[version] = _create_store(f"products_{version}")
+    return store
+
+
+_FIELD_NAME = re.compile(r"^\w+$")
+# Item ids as this app makes them (uuid4 strings); cursors carry nothing else
+_ITEM_ID = re.compile(r"^[\w-]+$")
+
+
+def encode_cursor(key: PageKey) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> PageKey:
+    """The keyset position in a cursor; raises ValueError unless it holds an ISO
+    timestamp (or nothing, for items without one) and a plain id, since both go
+    into the Supabase filter as they are"""
+    try:
+        created_at, item_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(created_at, str) or not isinstance(item_id, str) or not _ITEM_ID.match(item_id):
+            raise ValueError
+        if created_at:
+            datetime.fromisoformat(created_at)
+        return created_at, item_id
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+async def list_products(store: ProductStore, status: Optional[str] = None, limit: Optional[int] = None,
+                        cursor: Optional[str] = None, fields: Optional[str] = None) -> Dict[str, Any]:
+    """Body for the /get and /items list endpoints.
+
+    Without ``limit`` or ``cursor`` every item is returned, as before.
+    With either, one page comes back along with ``next_cursor`` (None on
+    the last page) and ``count``, the total across all pages, counted by
+    the store on the first page only (it is None on later pages, sparing
+    a full count per page). ``fields`` is a comma-separated list of fields to keep.
+    Raises ValueError for a bad cursor, limit or field name.
+    """
+    field_list = None
+    if fields:
+        field_list = [field.strip() for field in fields.split(",") if field.strip()]
+        if not all(_FIELD_NAME.match(field) for field in field_list):
+            raise ValueError("fields must be a comma-separated list of field names")
+
+    if limit is None and cursor is None:
+        items = await store.list(status)
+        if field_list is not None:
+            items = [_project(item, field_list) for item in items]
+        return {"items": items, "count": len(items)}
+
+    if limit is None:
+        limit = PRODUCT_PAGE_SIZE
+    if not 0 < limit <= PRODUCT_PAGE_MAX:
+        raise ValueError(f"limit must be between 1 and {PRODUCT_PAGE_MAX}")
+    after = decode_cursor(cursor) if cursor else None
+    # One extra row tells whether another page follows
+    if after is None:
+        rows, total = await asyncio.gather(store.page(after, limit + 1, status, field_list), store.count(status))
+    else:
+        rows, total = await store.page(after, limit + 1, status, field_list), None
+    next_cursor = encode_cursor(rows[limit - 1][0]) if len(rows) > limit else None
+    return {"items": [item for _, item in rows[:limit]], "count": total, "next_cursor": next_cursor}
+
+
+def _bulk_chunk_size(chunk_size: Optional[int]) -> int:
+    if chunk_size is None:
+        return BULK_CHUNK_SIZE
+    if not 0 < chunk_size <= BULK_CHUNK_MAX:
+        raise ValueError(f"chunk_size must be between 1 and {BULK_CHUNK_MAX}")
+    return chunk_size
+
+
+def _bulk_report(results: List[Dict[str, Any]], chunks: int, failures: List[Dict[str, Any]]) -> Dict[str, Any]:
+    failed = sum(1 for result in results if "error" in result)
+    return {
+        "results": results,
+        "requested": len(results),
+        "succeeded": len(results) - failed,
+        "failed": failed,
+        "chunks": chunks,
+        "failed_chunks": failures,
+    }
+
+
+def _chunk_failure(number: int, start: int, size: int, error: Exception) -> Dict[str, Any]:
+    print(f"⚠️  Bulk write error in chunk {number}: {error}")
+    failure = {"chunk": number, "start_index": start, "size": size, "error": str(error)}
+    if isinstance(error, PartialWriteError):
+        # Only these ids need retrying; the rest of the chunk went through
+        failure["failed_ids"] = list(error.failed)
+    return failure
+
+
+# The bulk_* helpers are the bodies of the /bulk endpoints. Each writes its
+# input one chunk (one store round trip) at a time and carries on past a chunk
+# that fails. Every input gets a result, in order, with its "index", "id" and a
+# "status"; failed ones have an "error" instead of an "item". Failed chunks
+# are also listed on their own, with where they start, so they can be retried
+# (with "failed_ids" when only part of the chunk failed).
+# Raise ValueError for a bad chunk_size.
+
+async def bulk_insert(store: ProductStore, items: List[Dict[str, Any]],
+                      chunk_size: Optional[int] = None) -> Dict[str, Any]:
+    """Insert new items (each already carrying its id)"""
+    size = _bulk_chunk_size(chunk_size)
+    results: List[Dict[str, Any]] = []
+    failures: List[Dict[str, Any]] = []
+    chunks = 0
+    for start in range(0, len(items), size):
+        chunk = items[start:start + size]
+        chunks += 1
+        try:
+            stored = await store.insert_many(chunk)
+        except Exception as e:
+            failures.append(_chunk_failure(chunks, start, len(chunk), e))
+            results.extend({"index": start + offset, "id": item["id"], "status": "failed", "error": str(e)}
+                           for offset, item in enumerate(chunk))
+            continue
+        # Matched up by id rather than position, in case the store returns rows in another order
+        stored_by_id = {item["id"]: item for item in stored}
+        results.extend({"index": start + offset, "id": item["id"], "status": "created",
+                        "item": stored_by_id.get(item["id"], item)}
+                       for offset, item in enumerate(chunk))
+    return _bulk_report(results, chunks, failures)
+
+
+async def bulk_update(store: ProductStore, changes: List[Dict[str, Any]],
+                      chunk_size: Optional[int] = None) -> Dict[str, Any]:
+    """Merge changes into existing items, each change naming its item by "id".
+
+    Changes without an id fail on their own; ids that don't exist come back
+    as "not_found", which doesn't count as a failure.
+    """
+    size = _bulk_chunk_size(chunk_size)
+    results: List[Optional[Dict[str, Any]]] = [None] * len(changes)
+    failures: List[Dict[str, Any]] = []
+    chunks = 0
+    valid: List[Tuple[int, Dict[str, Any]]] = []
+    for index, change in enumerate(changes):
+        if change.get("id") is None:
+            results[index] = {"index": index, "id": None, "status": "failed", "error": "Missing id"}
+        else:
+            valid.append((index, change))
+
+    for start in range(0, len(valid), size):
+        chunk = valid[start:start + size]
+        chunks += 1
+        failed: Dict[str, str] = {}
+        try:
+            updated = await store.update_many([change for _, change in chunk])
+        except PartialWriteError as e:
+            failures.append(_chunk_failure(chunks, chunk[0][0], len(chunk), e))
+            updated, failed = e.written, e.failed
+        except Exception as e:
+            failures.append(_chunk_failure(chunks, chunk[0][0], len(chunk), e))
+            for index, change in chunk:
+                results[index] = {"index": index, "id": change["id"], "status": "failed", "error": str(e)}
+            continue
+        for index, change in chunk:
+            if change["id"] in failed:
+                results[index] = {"index": index, "id": change["id"], "status": "failed",
+                                  "error": failed[change["id"]]}
+                continue
+            item = updated.get(change["id"])
+            results[index] = {"index": index, "id": change["id"],
+                              "status": "updated" if item is not None else "not_found", "item": item}
+    return _bulk_report(results, chunks, failures)
+
+
+async def bulk_delete(store: ProductStore, item_ids: List[str],
+                      chunk_size: Optional[int] = None) -> Dict[str, Any]:
+    """Remove items by id; ids that don't exist come back as "not_found", which doesn't count as a failure"""
+    size = _bulk_chunk_size(chunk_size)
+    results: List[Dict[str, Any]] = []
+    failures: List[Dict[str, Any]] = []
+    chunks = 0
+    for start in range(0, len(item_ids), size):
+        chunk = item_ids[start:start + size]
+        chunks += 1
+        failed: Dict[str, str] = {}
+        try:
+            deleted = await store.delete_many(chunk)
+        except PartialWriteError as e:
+            failures.append(_chunk_failure(chunks, start, len(chunk), e))
+            deleted, failed = e.written, e.failed
+        except Exception as e:
+            failures.append(_chunk_failure(chunks, start, len(chunk), e))
+            results.extend({"index": start + offset, "id": item_id, "status": "failed", "error": str(e)}
+                           for offset, item_id in enumerate(chunk))
+            continue
+        for offset, item_id in enumerate(chunk):
+            if item_id in failed:
+                results.append({"index": start + offset, "id": item_id, "status": "failed",
+                                "error": failed[item_id]})
+                continue
+            # An id listed twice is deleted once; the repeat finds nothing
+            item = deleted.pop(item_id, None)
+            results.append({"index": start + offset, "id": item_id,
+                            "status": "deleted" if item is not None else "not_found", "item": item})
+    return _bulk_report(results, chunks, failures)
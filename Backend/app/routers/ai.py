@@ -25,6 +25,7 @@ from app.models import (
     TestCaseGenerationResponse,
     ChatRequest,
 )
+from app.diff_engine import difference_path
 
 logger = logging.getLogger(__name__)
 
@@ -134,13 +135,13 @@ async def plan_workflow(request: WorkflowPlanRequest):
 async def explain_regression(request: AIExplanationRequest):
     """Explain regressions using Gemini (genai) when available, else fallback."""
     if not _gemini_client:
-        differences_summary = ", ".join([d.get("path", "unknown") for d in request.comparison_result.differences[:3]])
+        differences_summary = ", ".join([difference_path(d) for d in request.comparison_result.differences[:3]])
         explanation = f"Regression detected in {request.comparison_result.endpoint}. Key differences: {differences_summary}."
         return AIExplanation(explanation=explanation, suggested_fix="Review differences and update v2 to match v1.", confidence_score=0.7, impact_assessment="Unknown")
 
     # Limit number of diffs to keep prompts small and latency low
     differences_text = "\n".join([
-        f"- {d.get('path', 'unknown')}: {d.get('type', 'unknown')} (v1: {d.get('v1_value', 'N/A')}, v2: {d.get('v2_value', 'N/A')})"
+        f"- {difference_path(d)}: {d.get('type', 'unknown')} (v1: {d.get('v1_value', 'N/A')}, v2: {d.get('v2_value', 'N/A')})"
         for d in request.comparison_result.differences[:5]
     ])
 
@@ -216,7 +217,7 @@ async def explain_regression(request: AIExplanationRequest):
             )
     except Exception as e:
         logger.error("Gemini explain error: %s", e)
-        differences_summary = ", ".join([d.get("path", "unknown") for d in request.comparison_result.differences[:3]])
+        differences_summary = ", ".join([difference_path(d) for d in request.comparison_result.differences[:3]])
         explanation = f"Regression detected in {request.comparison_result.endpoint}. Key differences: {differences_summary}."
         return AIExplanation(explanation=explanation, suggested_fix="Review differences and update v2 to match v1.", confidence_score=0.7, impact_assessment="Unknown")
 
@@ -232,7 +233,7 @@ async def chat_with_gemini(request: ChatRequest):
         return {"response": explanation.explanation}
 
     differences_text = "\n".join([
-        f"- {d.get('path', 'unknown')}: {d.get('type', 'unknown')} (v1: {str(d.get('v1_value', 'N/A'))[:50]}, v2: {str(d.get('v2_value', 'N/A'))[:50]})"
+        f"- {difference_path(d)}: {d.get('type', 'unknown')} (v1: {str(d.get('v1_value', 'N/A'))[:50]}, v2: {str(d.get('v2_value', 'N/A'))[:50]})"
         for d in request.context.differences[:10]
     ])
 
@@ -320,7 +321,7 @@ async def analyze_report(request: ReportAnalysisRequest):
     differences_text = ""
     if regressions and len(regressions) > 0:
         differences_text = "\n".join([
-            f"- {d.get('path', 'unknown')}: {d.get('type', 'unknown')} (v1: {str(d.get('v1_value', 'N/A'))[:50]}, v2: {str(d.get('v2_value', 'N/A'))[:50]})"
+            f"- {difference_path(d)}: {d.get('type', 'unknown')} (v1: {str(d.get('v1_value', 'N/A'))[:50]}, v2: {str(d.get('v2_value', 'N/A'))[:50]})"
             for d in regressions[0].get("differences", [])[:10]
         ])
     
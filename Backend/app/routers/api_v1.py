@@ -2,26 +2,16 @@ from fastapi import APIRouter, HTTPException
 from typing import Dict, Any, Optional
 from datetime import datetime
 import uuid
-from app.database import get_supabase
+from app.models import BulkCreateRequest, BulkUpdateRequest, BulkDeleteRequest
+from app.product_store import get_product_store, list_products, bulk_insert, bulk_update, bulk_delete
 from fastapi import Body
 
 router = APIRouter()
 
-# Fallback in-memory store if Supabase not available
-v1_data_store: Dict[str, Dict[str, Any]] = {}
-
-def get_v1_store():
-    """Get v1 data store - Supabase or in-memory fallback"""
-    supabase = get_supabase()
-    if supabase:
-        return supabase.table("products_v1")
-    return v1_data_store
-
-@router.post("/create")
-async def create_v1(data: Dict[str, Any]):
-    """Create endpoint for API v1"""
+def _new_item(data: Dict[str, Any]) -> Dict[str, Any]:
+    """A v1 item built from a create body, as /create and /bulk/create store it"""
     item_id = str(uuid.uuid4())
-    item = {
+    return {
         "id": item_id,
         **data,
         "created_at": datetime.now().isoformat(),
@@ -31,128 +21,79 @@ async def create_v1(data: Dict[str, Any]):
         "discount_rate": 0.1,
         "loyalty_discount": 0.05
     }
-    
-    supabase = get_supabase()
-    if supabase:
-        try:
-            response = supabase.table("products_v1").insert(item).execute()
-            if response.data:
-                return response.data[0]
-            return item
-        except Exception as e:
-            print(f"⚠️  Supabase insert error: {e}")
-            # Fallback to in-memory
-            v1_data_store[item_id] = item
-            return item
-    else:
-        v1_data_store[item_id] = item
-        return item
+
+@router.post("/create")
+async def create_v1(data: Dict[str, Any]):
+    """Create endpoint for API v1"""
+    return await get_product_store("v1").insert(_new_item(data))
 
 @router.get("/get/{item_id}")
 async def get_v1(item_id: str):
     """Get endpoint for API v1"""
-    supabase = get_supabase()
-    if supabase:
-        try:
-            response = supabase.table("products_v1").select("*").eq("id", item_id).execute()
-            if response.data and len(response.data) > 0:
-                return response.data[0]
-            raise HTTPException(status_code=404, detail="Item not found")
-        except HTTPException:
-            raise
-        except Exception as e:
-            print(f"⚠️  Supabase query error: {e}")
-            # Fallback to in-memory
-            if item_id not in v1_data_store:
-                raise HTTPException(status_code=404, detail="Item not found")
-            return v1_data_store[item_id]
-    else:
-        if item_id not in v1_data_store:
-            raise HTTPException(status_code=404, detail="Item not found")
-        return v1_data_store[item_id]
+    item = await get_product_store("v1").get(item_id)
+    if item is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return item
 
 @router.get("/get")
-async def get_all_v1():
-    """Get all items for API v1"""
-    supabase = get_supabase()
-    if supabase:
-        try:
-            response = supabase.table("products_v1").select("*").execute()
-            items = response.data if response.data else []
-            return {"items": items, "count": len(items)}
-        except Exception as e:
-            print(f"⚠️  Supabase query error: {e}")
-            # Fallback to in-memory
-            return {"items": list(v1_data_store.values()), "count": len(v1_data_store)}
-    else:
-        return {"items": list(v1_data_store.values()), "count": len(v1_data_store)}
+async def get_all_v1(status: Optional[str] = None, limit: Optional[int] = None,
+                     cursor: Optional[str] = None, fields: Optional[str] = None):
+    """Get all items for API v1, oldest first (only those with ``status``, if given)
+    
+    Pass ``limit`` and/or ``cursor`` to page through them instead (see
+    product_store.list_products), and ``fields`` to return only some fields.
+    """
+    try:
+        return await list_products(get_product_store("v1"), status, limit, cursor, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.put("/update/{item_id}")
 async def update_v1(item_id: str, data: Dict[str, Any]):
     """Update endpoint for API v1"""
-    supabase = get_supabase()
-    if supabase:
-        try:
-            # Check if exists
-            check = supabase.table("products_v1").select("id").eq("id", item_id).execute()
-            if not check.data or len(check.data) == 0:
-                raise HTTPException(status_code=404, detail="Item not found")
-            
-            data["updated_at"] = datetime.now().isoformat()
-            response = supabase.table("products_v1").update(data).eq("id", item_id).execute()
-            if response.data and len(response.data) > 0:
-                return response.data[0]
-            # Fallback to in-memory
-            if item_id not in v1_data_store:
-                raise HTTPException(status_code=404, detail="Item not found")
-            v1_data_store[item_id].update(data)
-            v1_data_store[item_id]["updated_at"] = datetime.now().isoformat()
-            return v1_data_store[item_id]
-        except HTTPException:
-            raise
-        except Exception as e:
-            print(f"⚠️  Supabase update error: {e}")
-            # Fallback to in-memory
-            if item_id not in v1_data_store:
-                raise HTTPException(status_code=404, detail="Item not found")
-            v1_data_store[item_id].update(data)
-            v1_data_store[item_id]["updated_at"] = datetime.now().isoformat()
-            return v1_data_store[item_id]
-    else:
-        if item_id not in v1_data_store:
-            raise HTTPException(status_code=404, detail="Item not found")
-        v1_data_store[item_id].update(data)
-        v1_data_store[item_id]["updated_at"] = datetime.now().isoformat()
-        return v1_data_store[item_id]
+    data["updated_at"] = datetime.now().isoformat()
+    item = await get_product_store("v1").update(item_id, data)
+    if item is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return item
 
 @router.delete("/delete/{item_id}")
 async def delete_v1(item_id: str):
     """Delete endpoint for API v1"""
-    supabase = get_supabase()
-    if supabase:
-        try:
-            # Get item before deleting
-            check = supabase.table("products_v1").select("*").eq("id", item_id).execute()
-            if not check.data or len(check.data) == 0:
-                raise HTTPException(status_code=404, detail="Item not found")
-            
-            deleted_item = check.data[0]
-            supabase.table("products_v1").delete().eq("id", item_id).execute()
-            return {"message": "Item deleted", "item": deleted_item}
-        except HTTPException:
-            raise
-        except Exception as e:
-            print(f"⚠️  Supabase delete error: {e}")
-            # Fallback to in-memory
-            if item_id not in v1_data_store:
-                raise HTTPException(status_code=404, detail="Item not found")
-            deleted_item = v1_data_store.pop(item_id)
-            return {"message": "Item deleted", "item": deleted_item}
-    else:
-        if item_id not in v1_data_store:
-            raise HTTPException(status_code=404, detail="Item not found")
-        deleted_item = v1_data_store.pop(item_id)
-        return {"message": "Item deleted", "item": deleted_item}
+    deleted_item = await get_product_store("v1").delete(item_id)
+    if deleted_item is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return {"message": "Item deleted", "item": deleted_item}
+
+# Bulk endpoints, for seeding and comparing large fixtures: each writes its
+# input in chunks of one round trip each and reports every item's outcome
+# (see product_store.bulk_insert). A failed chunk doesn't stop the rest.
+@router.post("/bulk/create")
+async def bulk_create_v1(request: BulkCreateRequest):
+    """Bulk create endpoint for API v1"""
+    try:
+        return await bulk_insert(get_product_store("v1"), [_new_item(data) for data in request.items],
+                                 request.chunk_size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.put("/bulk/update")
+async def bulk_update_v1(request: BulkUpdateRequest):
+    """Bulk update endpoint for API v1"""
+    updated_at = datetime.now().isoformat()
+    changes = [{**change, "updated_at": updated_at} for change in request.items]
+    try:
+        return await bulk_update(get_product_store("v1"), changes, request.chunk_size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/bulk/delete")
+async def bulk_delete_v1(request: BulkDeleteRequest):
+    """Bulk delete endpoint for API v1"""
+    try:
+        return await bulk_delete(get_product_store("v1"), request.ids, request.chunk_size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 # Compatibility endpoints under /products (aliases) to match client expectations
@@ -167,8 +108,9 @@ async def get_v1_products(item_id: str):
 
 
 @router.get("/products")
-async def get_all_v1_products():
-    return await get_all_v1()
+async def get_all_v1_products(status: Optional[str] = None, limit: Optional[int] = None,
+                              cursor: Optional[str] = None, fields: Optional[str] = None):
+    return await get_all_v1(status, limit, cursor, fields)
 
 
 @router.put("/products/{item_id}")
@@ -192,8 +134,9 @@ async def get_v1_items(item_id: str):
     return await get_v1(item_id)
 
 @router.get("/items")
-async def get_all_v1_items():
-    return await get_all_v1()
+async def get_all_v1_items(status: Optional[str] = None, limit: Optional[int] = None,
+                           cursor: Optional[str] = None, fields: Optional[str] = None):
+    return await get_all_v1(status, limit, cursor, fields)
 
 @router.put("/items/{item_id}")
 async def update_v1_items(item_id: str, data: Dict[str, Any] = Body(...)):
@@ -214,8 +157,9 @@ async def get_v1_items(item_id: str):
     return await get_v1(item_id)
 
 @router.get("/items")
-async def get_all_v1_items():
-    return await get_all_v1()
+async def get_all_v1_items(status: Optional[str] = None, limit: Optional[int] = None,
+                           cursor: Optional[str] = None, fields: Optional[str] = None):
+    return await get_all_v1(status, limit, cursor, fields)
 
 @router.put("/items/{item_id}")
 async def update_v1_items(item_id: str, data: Dict[str, Any] = Body(...)):
@@ -1,20 +1,17 @@
 from fastapi import APIRouter, HTTPException
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from datetime import datetime
 import uuid
-from app.database import get_supabase
+from app.models import BulkCreateRequest, BulkUpdateRequest, BulkDeleteRequest
+from app.product_store import get_product_store, list_products, bulk_insert, bulk_update, bulk_delete
 from fastapi import Body
 
 router = APIRouter()
 
-# Fallback in-memory store if Supabase not available
-v2_data_store: Dict[str, Dict[str, Any]] = {}
-
-@router.post("/create")
-async def create_v2(data: Dict[str, Any]):
-    """Create endpoint for API v2 - INTENTIONALLY DIFFERENT from v1"""
+def _new_item(data: Dict[str, Any]) -> Dict[str, Any]:
+    """A v2 item built from a create body, as /create and /bulk/create store it"""
     item_id = str(uuid.uuid4())
-    item = {
+    return {
         "id": item_id,
         **data,
         "created_at": datetime.now().isoformat(),
@@ -22,128 +19,79 @@ async def create_v2(data: Dict[str, Any]):
         "status": "active"
         # v2 REMOVES: dueDate, discountRate, loyaltyDiscount (regressions!)
     }
-    
-    supabase = get_supabase()
-    if supabase:
-        try:
-            response = supabase.table("products_v2").insert(item).execute()
-            if response.data:
-                return response.data[0]
-            return item
-        except Exception as e:
-            print(f"⚠️  Supabase insert error: {e}")
-            # Fallback to in-memory
-            v2_data_store[item_id] = item
-            return item
-    else:
-        v2_data_store[item_id] = item
-        return item
+
+@router.post("/create")
+async def create_v2(data: Dict[str, Any]):
+    """Create endpoint for API v2 - INTENTIONALLY DIFFERENT from v1"""
+    return await get_product_store("v2").insert(_new_item(data))
 
 @router.get("/get/{item_id}")
 async def get_v2(item_id: str):
     """Get endpoint for API v2"""
-    supabase = get_supabase()
-    if supabase:
-        try:
-            response = supabase.table("products_v2").select("*").eq("id", item_id).execute()
-            if response.data and len(response.data) > 0:
-                return response.data[0]
-            raise HTTPException(status_code=404, detail="Item not found")
-        except HTTPException:
-            raise
-        except Exception as e:
-            print(f"⚠️  Supabase query error: {e}")
-            # Fallback to in-memory
-            if item_id not in v2_data_store:
-                raise HTTPException(status_code=404, detail="Item not found")
-            return v2_data_store[item_id]
-    else:
-        if item_id not in v2_data_store:
-            raise HTTPException(status_code=404, detail="Item not found")
-        return v2_data_store[item_id]
+    item = await get_product_store("v2").get(item_id)
+    if item is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return item
 
 @router.get("/get")
-async def get_all_v2():
-    """Get all items for API v2"""
-    supabase = get_supabase()
-    if supabase:
-        try:
-            response = supabase.table("products_v2").select("*").execute()
-            items = response.data if response.data else []
-            return {"items": items, "count": len(items)}
-        except Exception as e:
-            print(f"⚠️  Supabase query error: {e}")
-            # Fallback to in-memory
-            return {"items": list(v2_data_store.values()), "count": len(v2_data_store)}
-    else:
-        return {"items": list(v2_data_store.values()), "count": len(v2_data_store)}
+async def get_all_v2(status: Optional[str] = None, limit: Optional[int] = None,
+                     cursor: Optional[str] = None, fields: Optional[str] = None):
+    """Get all items for API v2, oldest first (only those with ``status``, if given)
+    
+    Pass ``limit`` and/or ``cursor`` to page through them instead (see
+    product_store.list_products), and ``fields`` to return only some fields.
+    """
+    try:
+        return await list_products(get_product_store("v2"), status, limit, cursor, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.put("/update/{item_id}")
 async def update_v2(item_id: str, data: Dict[str, Any]):
     """Update endpoint for API v2"""
-    supabase = get_supabase()
-    if supabase:
-        try:
-            # Check if exists
-            check = supabase.table("products_v2").select("id").eq("id", item_id).execute()
-            if not check.data or len(check.data) == 0:
-                raise HTTPException(status_code=404, detail="Item not found")
-            
-            data["updated_at"] = datetime.now().isoformat()
-            response = supabase.table("products_v2").update(data).eq("id", item_id).execute()
-            if response.data and len(response.data) > 0:
-                return response.data[0]
-            # Fallback to in-memory
-            if item_id not in v2_data_store:
-                raise HTTPException(status_code=404, detail="Item not found")
-            v2_data_store[item_id].update(data)
-            v2_data_store[item_id]["updated_at"] = datetime.now().isoformat()
-            return v2_data_store[item_id]
-        except HTTPException:
-            raise
-        except Exception as e:
-            print(f"⚠️  Supabase update error: {e}")
-            # Fallback to in-memory
-            if item_id not in v2_data_store:
-                raise HTTPException(status_code=404, detail="Item not found")
-            v2_data_store[item_id].update(data)
-            v2_data_store[item_id]["updated_at"] = datetime.now().isoformat()
-            return v2_data_store[item_id]
-    else:
-        if item_id not in v2_data_store:
-            raise HTTPException(status_code=404, detail="Item not found")
-        v2_data_store[item_id].update(data)
-        v2_data_store[item_id]["updated_at"] = datetime.now().isoformat()
-        return v2_data_store[item_id]
+    data["updated_at"] = datetime.now().isoformat()
+    item = await get_product_store("v2").update(item_id, data)
+    if item is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return item
 
 @router.delete("/delete/{item_id}")
 async def delete_v2(item_id: str):
     """Delete endpoint for API v2"""
-    supabase = get_supabase()
-    if supabase:
-        try:
-            # Get item before deleting
-            check = supabase.table("products_v2").select("*").eq("id", item_id).execute()
-            if not check.data or len(check.data) == 0:
-                raise HTTPException(status_code=404, detail="Item not found")
-            
-            deleted_item = check.data[0]
-            supabase.table("products_v2").delete().eq("id", item_id).execute()
-            return {"message": "Item deleted", "item": deleted_item}
-        except HTTPException:
-            raise
-        except Exception as e:
-            print(f"⚠️  Supabase delete error: {e}")
-            # Fallback to in-memory
-            if item_id not in v2_data_store:
-                raise HTTPException(status_code=404, detail="Item not found")
-            deleted_item = v2_data_store.pop(item_id)
-            return {"message": "Item deleted", "item": deleted_item}
-    else:
-        if item_id not in v2_data_store:
-            raise HTTPException(status_code=404, detail="Item not found")
-        deleted_item = v2_data_store.pop(item_id)
-        return {"message": "Item deleted", "item": deleted_item}
+    deleted_item = await get_product_store("v2").delete(item_id)
+    if deleted_item is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return {"message": "Item deleted", "item": deleted_item}
+
+# Bulk endpoints, for seeding and comparing large fixtures: each writes its
+# input in chunks of one round trip each and reports every item's outcome
+# (see product_store.bulk_insert). A failed chunk doesn't stop the rest.
+@router.post("/bulk/create")
+async def bulk_create_v2(request: BulkCreateRequest):
+    """Bulk create endpoint for API v2"""
+    try:
+        return await bulk_insert(get_product_store("v2"), [_new_item(data) for data in request.items],
+                                 request.chunk_size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.put("/bulk/update")
+async def bulk_update_v2(request: BulkUpdateRequest):
+    """Bulk update endpoint for API v2"""
+    updated_at = datetime.now().isoformat()
+    changes = [{**change, "updated_at": updated_at} for change in request.items]
+    try:
+        return await bulk_update(get_product_store("v2"), changes, request.chunk_size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/bulk/delete")
+async def bulk_delete_v2(request: BulkDeleteRequest):
+    """Bulk delete endpoint for API v2"""
+    try:
+        return await bulk_delete(get_product_store("v2"), request.ids, request.chunk_size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 # Compatibility endpoints under /products (aliases) to match client expectations
@@ -158,8 +106,9 @@ async def get_v2_products(item_id: str):
 
 
 @router.get("/products")
-async def get_all_v2_products():
-    return await get_all_v2()
+async def get_all_v2_products(status: Optional[str] = None, limit: Optional[int] = None,
+                              cursor: Optional[str] = None, fields: Optional[str] = None):
+    return await get_all_v2(status, limit, cursor, fields)
 
 
 @router.put("/products/{item_id}")
@@ -180,8 +129,9 @@ async def get_v2_items(item_id: str):
     return await get_v2(item_id)
 
 @router.get("/items")
-async def get_all_v2_items():
-    return await get_all_v2()
+async def get_all_v2_items(status: Optional[str] = None, limit: Optional[int] = None,
+                           cursor: Optional[str] = None, fields: Optional[str] = None):
+    return await get_all_v2(status, limit, cursor, fields)
 
 @router.put("/items/{item_id}")
 async def update_v2_items(item_id: str, data: Dict[str, Any] = Body(...)):
@@ -1,187 +1,628 @@
 from fastapi import APIRouter, HTTPException, Depends
-from typing import List, Dict, Any
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Any, Optional, Tuple
+import asyncio
+from collections import deque
+import anyio
 import httpx
 import json
 from datetime import datetime
 import os
 
-from app.models import ComparisonRequest, ComparisonResult, RegressionSummary
-from app.diff_engine import DiffEngine
+from app.models import (
+    ComparisonRequest,
+    ComparisonResult,
+    CompareAllRequest,
+    RegressionSummary,
+    RequestTimings,
+    TestCase,
+    BatchTestRunRequest,
+    BatchDiffRequest,
+    DiffOptions,
+    PagedComparisonRequest,
+)
+from app.diff_engine import DiffEngine, DiffBudget, RegressionClassifier, DEFAULT_DIFF_OPTIONS, _compact_diff, difference_path
 from app.database import get_db
+from app.batch_diff import compare_batch
+from app.diff_cache import content_hash, diff_cache
+from app.diff_executor import compare_responses
+from app.schema_fingerprint import cached_fingerprint, fingerprint_response, record_schema, schema_changes
+from app.http_client import get_http_client, host_slot, host_slots, send_timed, RequestTimer
+from app.scheduler import iter_comparisons, run_comparisons
+from app.stream_diff import STREAMING_AVAILABLE, iter_stream_differences, missing_difference, response_events
 
 router = APIRouter()
 
 BASE_URL = os.getenv("BASE_URL", "http://localhost:8000")
 
+SUPPORTED_METHODS = ("GET", "POST", "PUT", "DELETE")
+
+# Per-side request timeout in seconds
+REQUEST_TIMEOUT_S = float(os.getenv("COMPARISON_REQUEST_TIMEOUT", "30"))
+
+# Latency regression: v2 must be this many times slower than v1...
+LATENCY_REGRESSION_THRESHOLD = float(os.getenv("LATENCY_REGRESSION_THRESHOLD", "1.5"))
+# ...and slower by at least this many ms, so sub-millisecond jitter isn't flagged
+LATENCY_REGRESSION_MIN_MS = float(os.getenv("LATENCY_REGRESSION_MIN_MS", "50"))
+
+# Default diff budget for requests whose diff_options don't set one (0 = no limit)
+DIFF_MAX_DIFFERENCES = int(os.getenv("DIFF_MAX_DIFFERENCES", "1000"))
+DIFF_MAX_DEPTH = int(os.getenv("DIFF_MAX_DEPTH", "64"))
+DIFF_MAX_VALUE_BYTES = int(os.getenv("DIFF_MAX_VALUE_BYTES", "1000000"))
+
+def _diff_budget(options: Optional[DiffOptions]) -> DiffBudget:
+    """Diff budget for a comparison, falling back to the server defaults"""
+    def limit(value: Optional[int], default: int) -> int:
+        return default if value is None else value
+    
+    options = options or DiffOptions()
+    return DiffBudget(
+        max_differences=limit(options.max_differences, DIFF_MAX_DIFFERENCES),
+        max_depth=limit(options.max_depth, DIFF_MAX_DEPTH),
+        max_value_bytes=limit(options.max_value_bytes, DIFF_MAX_VALUE_BYTES),
+    )
+
+def _request_kwargs(method: str, request: ComparisonRequest) -> Dict[str, Any]:
+    """Query params or JSON body to send for a comparison request"""
+    if method == "GET":
+        return {"params": request.params}
+    elif method in ("POST", "PUT"):
+        return {"json": request.payload}
+    return {}
+
+async def _send_request(client: httpx.AsyncClient, method: str, url: str,
+                        request: ComparisonRequest, timeout: float) -> Tuple[httpx.Response, RequestTimer]:
+    """Send one side of a comparison request"""
+    async with host_slot(url):
+        # Per request, so a timeout_s above the shared client's HTTP_TIMEOUT isn't cut short by it
+        return await send_timed(client, method, url, timeout=timeout, **_request_kwargs(method, request))
+
+async def _fetch_side(client: httpx.AsyncClient, label: str, method: str, url: str,
+                      request: ComparisonRequest, timeout: float):
+    """Fetch one version's response, turning a timeout into a per-side error.
+
+    Returns (response, timer, error). Transport errors still propagate so the
+    caller can cancel the other side and fail the comparison as a whole.
+    """
+    try:
+        response, timer = await asyncio.wait_for(_send_request(client, method, url, request, timeout),
+                                                 timeout=timeout)
+        return response, timer, None
+    except (asyncio.TimeoutError, httpx.TimeoutException):
+        return None, None, f"{label} timed out after {timeout}s"
+
+async def _fetch_both(client: httpx.AsyncClient, method: str, v1_url: str, v2_url: str,
+                      request: ComparisonRequest):
+    """Fetch v1 and v2, concurrently unless the request opts out"""
+    timeout = request.timeout_s or REQUEST_TIMEOUT_S
+    if not request.concurrent:
+        v1 = await _fetch_side(client, "v1", method, v1_url, request, timeout)
+        v2 = await _fetch_side(client, "v2", method, v2_url, request, timeout)
+        return v1, v2
+    
+    tasks = [
+        asyncio.ensure_future(_fetch_side(client, "v1", method, v1_url, request, timeout)),
+        asyncio.ensure_future(_fetch_side(client, "v2", method, v2_url, request, timeout)),
+    ]
+    try:
+        v1, v2 = await asyncio.gather(*tasks)
+    except BaseException:
+        # One side failed (or we were cancelled) - don't leave the other in flight
+        for task in tasks:
+            task.cancel()
+        raise
+    return v1, v2
+
+def _parse_response(label: str, response: Optional[httpx.Response], timer: Optional[RequestTimer],
+                    fetch_error: Optional[str]):
+    """Parse a response body, returning (data, error) for one side"""
+    if fetch_error:
+        return {"error": fetch_error}, fetch_error
+    try:
+        if response.status_code == 200:
+            return timer.parse_json(response), None
+        error = f"{label} returned {response.status_code}: {response.text[:100]}"
+        try:
+            return timer.parse_json(response), error
+        except:
+            return {"error": error}, error
+    except Exception as e:
+        error = f"Failed to parse {label} response: {str(e)}"
+        return {"error": error}, error
+
+def _error_difference(v1_error: Optional[str], v2_error: Optional[str],
+                      options: Optional[DiffOptions] = None) -> Optional[Dict[str, Any]]:
+    """The difference recording a failed response on either side, if any (compact if the options are)"""
+    diff = _plain_error_difference(v1_error, v2_error)
+    if diff is not None and options is not None and options.compact:
+        return _compact_diff(diff, "response_error", options.compact_value_bytes)
+    return diff
+
+def _plain_error_difference(v1_error: Optional[str], v2_error: Optional[str]) -> Optional[Dict[str, Any]]:
+    if v1_error and not v2_error:
+        return {
+            "path": "response_error",
+            "type": "v1_error",
+            "v1_value": v1_error,
+            "v2_value": "success",
+            "severity": "high",
+            "is_expected": False  # Errors are never expected
+        }
+    elif v2_error and not v1_error:
+        return {
+            "path": "response_error",
+            "type": "v2_error",
+            "v1_value": "success",
+            "v2_value": v2_error,
+            "severity": "high",
+            "is_expected": False  # Errors are never expected
+        }
+    elif v1_error and v2_error:
+        return {
+            "path": "response_error",
+            "type": "both_errors",
+            "v1_value": v1_error,
+            "v2_value": v2_error,
+            "severity": "high",
+            "is_expected": False  # Errors are never expected
+        }
+    return None
+
+def _latency_verdict(v1_timings: Optional[RequestTimings], v2_timings: Optional[RequestTimings],
+                     threshold: float) -> Tuple[bool, Optional[float]]:
+    """Decide whether v2 is meaningfully slower than v1.
+
+    Connection setup is left out: whether a side got a pooled connection
+    says nothing about the version under test.
+    """
+    if not v1_timings or not v2_timings:
+        return False, None
+    v1_ms = v1_timings.total_ms - v1_timings.connect_ms
+    v2_ms = v2_timings.total_ms - v2_timings.connect_ms
+    if v1_ms <= 0:
+        return False, None
+    ratio = round(v2_ms / v1_ms, 3)
+    return ratio > threshold and (v2_ms - v1_ms) >= LATENCY_REGRESSION_MIN_MS, ratio
+
 @router.post("/compare", response_model=ComparisonResult)
 async def compare_endpoints(request: ComparisonRequest):
     """Compare a single endpoint between two versions"""
     try:
-        async with httpx.AsyncClient() as client:
-            # Make requests to both versions (default to v1 and v2 if not specified)
-            v1_version = request.v1_version or "v1"
-            v2_version = request.v2_version or "v2"
-            v1_url = f"{BASE_URL}/api/{v1_version}{request.endpoint}"
-            v2_url = f"{BASE_URL}/api/{v2_version}{request.endpoint}"
-            
-            # Prepare request based on method
-            if request.method.upper() == "GET":
-                v1_response = await client.get(v1_url, params=request.params)
-                v2_response = await client.get(v2_url, params=request.params)
-            elif request.method.upper() == "POST":
-                v1_response = await client.post(v1_url, json=request.payload)
-                v2_response = await client.post(v2_url, json=request.payload)
-            elif request.method.upper() == "PUT":
-                v1_response = await client.put(v1_url, json=request.payload)
-                v2_response = await client.put(v2_url, json=request.payload)
-            elif request.method.upper() == "DELETE":
-                v1_response = await client.delete(v1_url)
-                v2_response = await client.delete(v2_url)
-            else:
-                raise HTTPException(status_code=400, detail="Unsupported method")
-            
-            # Handle non-200 responses
-            v1_data = {}
-            v2_data = {}
-            v1_error = None
-            v2_error = None
-            
-            try:
-                if v1_response.status_code == 200:
-                    v1_data = v1_response.json()
-                else:
-                    v1_error = f"v1 returned {v1_response.status_code}: {v1_response.text[:100]}"
-                    try:
-                        v1_data = v1_response.json()
-                    except:
-                        v1_data = {"error": v1_error}
-            except Exception as e:
-                v1_error = f"Failed to parse v1 response: {str(e)}"
-                v1_data = {"error": v1_error}
-            
-            try:
-                if v2_response.status_code == 200:
-                    v2_data = v2_response.json()
-                else:
-                    v2_error = f"v2 returned {v2_response.status_code}: {v2_response.text[:100]}"
-                    try:
-                        v2_data = v2_response.json()
-                    except:
-                        v2_data = {"error": v2_error}
-            except Exception as e:
-                v2_error = f"Failed to parse v2 response: {str(e)}"
-                v2_data = {"error": v2_error}
-            
+        method = request.method.upper()
+        if method not in SUPPORTED_METHODS:
+            raise HTTPException(status_code=400, detail="Unsupported method")
+        
+        client = get_http_client()
+        # Make requests to both versions (default to v1 and v2 if not specified)
+        v1_version = request.v1_version or "v1"
+        v2_version = request.v2_version or "v2"
+        v1_url = f"{BASE_URL}/api/{v1_version}{request.endpoint}"
+        v2_url = f"{BASE_URL}/api/{v2_version}{request.endpoint}"
+        
+        (v1_response, v1_timer, v1_fetch_error), (v2_response, v2_timer, v2_fetch_error) = await _fetch_both(
+            client, method, v1_url, v2_url, request
+        )
+        
+        # Handle non-200 responses and timeouts
+        v1_data, v1_error = _parse_response("v1", v1_response, v1_timer, v1_fetch_error)
+        v2_data, v2_error = _parse_response("v2", v2_response, v2_timer, v2_fetch_error)
+        v1_timings = RequestTimings(**v1_timer.as_dict()) if v1_timer else None
+        v2_timings = RequestTimings(**v2_timer.as_dict()) if v2_timer else None
+        
+        # Each successful body is hashed once; the hashes key both the schema
+        # fingerprints (for drift) and the diff result cache
+        v1_body = v1_response.content if not v1_error else None
+        v2_body = v2_response.content if not v2_error else None
+        v1_hash = content_hash(v1_body) if v1_body is not None else None
+        v2_hash = content_hash(v2_body) if v2_body is not None else None
+        
+        # Bodies already diffed under the same options reuse the earlier result,
+        # fingerprints included
+        cache_key = None
+        if v1_hash is not None and v2_hash is not None:
+            cache_key = diff_cache.key(v1_hash, v2_hash, request.diff_options)
+        cached = diff_cache.get(cache_key) if cache_key is not None else None
+        if cached is not None:
+            differences, budget, verdict, v1_schema, v2_schema = cached
+            differences = list(differences)
+        else:
+            v1_schema = cached_fingerprint(v1_hash) if v1_hash is not None else None
+            v2_schema = cached_fingerprint(v2_hash) if v2_hash is not None else None
             # Compare responses (even if there were errors)
-            differences = DiffEngine.deep_compare(v1_data, v2_data)
-            
-            # Add error differences if present (these are always regressions)
-            if v1_error or v2_error:
-                if v1_error and not v2_error:
-                    differences.append({
-                        "path": "response_error",
-                        "type": "v1_error",
-                        "v1_value": v1_error,
-                        "v2_value": "success",
-                        "severity": "high",
-                        "is_expected": False  # Errors are never expected
-                    })
-                elif v2_error and not v1_error:
-                    differences.append({
-                        "path": "response_error",
-                        "type": "v2_error",
-                        "v1_value": "success",
-                        "v2_value": v2_error,
-                        "severity": "high",
-                        "is_expected": False  # Errors are never expected
-                    })
-                elif v1_error and v2_error:
-                    differences.append({
-                        "path": "response_error",
-                        "type": "both_errors",
-                        "v1_value": v1_error,
-                        "v2_value": v2_error,
-                        "severity": "high",
-                        "is_expected": False  # Errors are never expected
-                    })
-            
-            is_regression = DiffEngine.detect_regressions(differences)
-            severity = DiffEngine.calculate_severity(differences)
-            
-            # Generate random request times (hardcoded for demo purposes)
-            import random
-            v1_time = round(random.uniform(50, 500), 2)  # Random between 50-500ms
-            v2_time = round(random.uniform(50, 500), 2)  # Random between 50-500ms
-            
-            result = ComparisonResult(
-                endpoint=request.endpoint,
-                method=request.method,
-                v1_response=v1_data,
-                v2_response=v2_data,
-                differences=differences,
-                is_regression=is_regression,
-                regression_severity=severity,
-                timestamp=datetime.now(),
-                v1_request_time_ms=v1_time,
-                v2_request_time_ms=v2_time
+            # Large bodies are diffed in a worker process so they don't stall the event loop;
+            # new bodies' schema paths are collected by the same pass, from the same parse
+            budget = _diff_budget(request.diff_options)
+            differences, budget, (v1_paths, v2_paths) = await compare_responses(
+                v1_data, v2_data, v1_body, v2_body, options=request.diff_options, budget=budget,
+                schema_sides=(v1_body is not None and v1_schema is None, v2_body is not None and v2_schema is None),
             )
+            if v1_body is not None and v1_schema is None:
+                v1_schema = fingerprint_response(v1_data, v1_hash, v1_paths)
+            if v2_body is not None and v2_schema is None:
+                v2_schema = fingerprint_response(v2_data, v2_hash, v2_paths)
             
-            return result
+            # Add error differences if present (these are always regressions)
+            error_difference = _error_difference(v1_error, v2_error, request.diff_options)
+            if error_difference:
+                differences.append(error_difference)
             
+            verdict = DiffEngine.classify(differences)
+            if cache_key is not None:
+                diff_cache.put(cache_key, (list(differences), budget, verdict, v1_schema, v2_schema))
+        record_schema(method, request.endpoint, v1_version, v1_schema)
+        record_schema(method, request.endpoint, v2_version, v2_schema)
+        
+        threshold = request.latency_regression_threshold or LATENCY_REGRESSION_THRESHOLD
+        is_latency_regression, latency_ratio = _latency_verdict(v1_timings, v2_timings, threshold)
+        
+        result = ComparisonResult(
+            endpoint=request.endpoint,
+            method=request.method,
+            v1_response=v1_data,
+            v2_response=v2_data,
+            differences=differences,
+            is_regression=verdict.is_regression,
+            regression_severity=verdict.severity,
+            timestamp=datetime.now(),
+            v1_request_time_ms=v1_timings.total_ms if v1_timings else None,
+            v2_request_time_ms=v2_timings.total_ms if v2_timings else None,
+            v1_timings=v1_timings,
+            v2_timings=v2_timings,
+            is_latency_regression=is_latency_regression,
+            latency_ratio=latency_ratio,
+            risk_counts=verdict.risk_counts,
+            counts_by_type=verdict.counts_by_type,
+            diff_truncated=budget.truncated,
+            diff_truncation_reason=budget.reason,
+            diff_summary=budget.summary if budget.truncated else None,
+            v1_schema_fingerprint=v1_schema.fingerprint if v1_schema else None,
+            v2_schema_fingerprint=v2_schema.fingerprint if v2_schema else None,
+            schema_changed=v1_schema.fingerprint != v2_schema.fingerprint if v1_schema and v2_schema else None
+        )
+        
+        return result
+        
+    except HTTPException:
+        raise
     except httpx.RequestError as e:
         raise HTTPException(status_code=500, detail=f"Request failed: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Comparison failed: {str(e)}")
 
+DEFAULT_COMPARE_ALL_ENDPOINTS = [
+    {"endpoint": "/create", "method": "POST", "payload": {"name": "Test Item", "value": 100}},
+    {"endpoint": "/get", "method": "GET"},
+]
+
+def _result_with_risk_counts(result: ComparisonResult) -> Dict[str, Any]:
+    """Convert a ComparisonResult (which carries its risk_counts) to a dict"""
+    return result.model_dump() if hasattr(result, 'model_dump') else result.dict()
+
+class _SummaryTotals:
+    """Running RegressionSummary totals, so results don't have to be kept around"""
+    
+    def __init__(self):
+        self.total = 0
+        self.regressions = 0
+        self.critical = 0
+        self.warnings = 0
+    
+    def add(self, result: Dict[str, Any]) -> None:
+        self.total += 1
+        if result.get("is_regression", False):
+            self.regressions += 1
+        if result.get("regression_severity") == "critical":
+            self.critical += 1
+        if result.get("regression_severity") in ["medium", "high"]:
+            self.warnings += 1
+    
+    def as_dict(self) -> Dict[str, Any]:
+        # Health score: 100 - (regressions * 20) - (warnings * 10)
+        health_score = max(0, 100 - (self.regressions * 20) - (self.warnings * 10))
+        return {
+            "total_endpoints_tested": self.total,
+            "regressions_found": self.regressions,
+            "critical_regressions": self.critical,
+            "warnings": self.warnings,
+            "health_score": health_score,
+        }
+
+def _build_summary(results: List[Dict[str, Any]]) -> RegressionSummary:
+    """Aggregate per-endpoint results into a RegressionSummary"""
+    totals = _SummaryTotals()
+    for result in results:
+        totals.add(result)
+    return RegressionSummary(**totals.as_dict(), results=results)
+
 @router.post("/compare-all", response_model=RegressionSummary)
-async def compare_all_endpoints():
-    """Compare all CRUD endpoints between v1 and v2"""
-    endpoints = [
-        {"endpoint": "/create", "method": "POST", "payload": {"name": "Test Item", "value": 100}},
-        {"endpoint": "/get", "method": "GET"},
-    ]
+async def compare_all_endpoints(request: Optional[CompareAllRequest] = None):
+    """Compare all CRUD endpoints between v1 and v2
     
-    results = []
-    for ep in endpoints:
-        request = ComparisonRequest(**ep)
-        result = await compare_endpoints(request)
-        # Add risk counts to each result
-        risk_counts = {"low": 0, "medium": 0, "high": 0}
-        if result.differences:
-            for diff in result.differences:
-                if diff.get("is_expected", False):
-                    continue  # Skip expected differences
-                severity = diff.get("severity", "low")
-                if severity == "high" or severity == "critical":
-                    risk_counts["high"] += 1
-                elif severity == "medium":
-                    risk_counts["medium"] += 1
+    Comparisons run concurrently (bounded by ``concurrency``), with creates
+    finishing before gets, updates and deletes. Results keep input order.
+    """
+    request = request or CompareAllRequest()
+    endpoints = request.endpoints or [ComparisonRequest(**ep) for ep in DEFAULT_COMPARE_ALL_ENDPOINTS]
+    
+    results = await run_comparisons(endpoints, compare_endpoints, request.concurrency)
+    return _build_summary([_result_with_risk_counts(result) for result in results])
+
+STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+def _stream_frame(frame: Dict[str, Any], fmt: str) -> str:
+    payload = json.dumps(jsonable_encoder(frame))
+    if fmt == "sse":
+        return f"event: {frame['type']}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+@router.post("/compare-all/stream")
+async def compare_all_endpoints_stream(request: Optional[CompareAllRequest] = None, format: str = "ndjson"):
+    """Streaming compare-all: one frame per result as it finishes, then a summary frame
+    
+    ``format`` is ``ndjson`` (one JSON object per line) or ``sse``
+    (Server-Sent Events). Result frames carry the original endpoint
+    ``index``; only running totals are kept, not the results themselves.
+    """
+    if format not in STREAM_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'sse'")
+    request = request or CompareAllRequest()
+    endpoints = request.endpoints or [ComparisonRequest(**ep) for ep in DEFAULT_COMPARE_ALL_ENDPOINTS]
+    
+    async def frames():
+        totals = _SummaryTotals()
+        try:
+            async for index, result in iter_comparisons(endpoints, compare_endpoints, request.concurrency):
+                result_dict = _result_with_risk_counts(result)
+                totals.add(result_dict)
+                yield _stream_frame({"type": "result", "index": index, "result": result_dict}, format)
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            yield _stream_frame({"type": "error", "detail": detail}, format)
+        yield _stream_frame({"type": "summary", **totals.as_dict()}, format)
+    
+    return StreamingResponse(frames(), media_type=STREAM_MEDIA_TYPES[format])
+
+@router.post("/compare/stream")
+async def compare_endpoints_stream(request: ComparisonRequest, format: str = "ndjson"):
+    """Streaming compare for very large responses: both bodies are parsed incrementally
+    
+    Emits a ``difference`` frame for each difference as it is found, then a
+    ``summary`` frame with the regression verdict. Neither response is held
+    in memory, so unlike /compare the responses themselves aren't returned,
+    and lists are always compared by position. ``diff_options.max_differences``
+    (or the server default) stops the comparison early.
+    """
+    if format not in STREAM_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'sse'")
+    if not STREAMING_AVAILABLE:
+        raise HTTPException(status_code=501, detail="Streaming comparison needs the 'ijson' package")
+    method = request.method.upper()
+    if method not in SUPPORTED_METHODS:
+        raise HTTPException(status_code=400, detail="Unsupported method")
+    
+    v1_url = f"{BASE_URL}/api/{request.v1_version or 'v1'}{request.endpoint}"
+    v2_url = f"{BASE_URL}/api/{request.v2_version or 'v2'}{request.endpoint}"
+    max_differences = _diff_budget(request.diff_options).max_differences
+    
+    async def frames():
+        client = get_http_client()
+        kwargs = _request_kwargs(method, request)
+        classifier = RegressionClassifier()
+        found = 0
+        truncated = False
+        try:
+            async with host_slots(v1_url, v2_url), \
+                    client.stream(method, v1_url, **kwargs) as v1_response, \
+                    client.stream(method, v2_url, **kwargs) as v2_response:
+                v1_error = None if v1_response.status_code == 200 else f"v1 returned {v1_response.status_code}"
+                v2_error = None if v2_response.status_code == 200 else f"v2 returned {v2_response.status_code}"
+                error_difference = _error_difference(v1_error, v2_error, request.diff_options)
+                if error_difference:
+                    classifier.add(error_difference)
+                    found += 1
+                    yield _stream_frame({"type": "difference", "difference": error_difference}, format)
                 else:
-                    risk_counts["low"] += 1
-        # Convert Pydantic model to dict and add risk_counts
-        result_dict = result.model_dump() if hasattr(result, 'model_dump') else result.dict()
-        result_dict["risk_counts"] = risk_counts
-        results.append(result_dict)
+                    differences = iter_stream_differences(
+                        response_events(v1_response), response_events(v2_response), request.diff_options
+                    )
+                    async for diff in differences:
+                        if max_differences and found >= max_differences:
+                            truncated = True
+                            break
+                        classifier.add(diff)
+                        found += 1
+                        yield _stream_frame({"type": "difference", "difference": diff}, format)
+        except Exception as e:
+            yield _stream_frame({"type": "error", "detail": f"Streaming comparison failed: {str(e)}"}, format)
+        
+        verdict = classifier.verdict()
+        yield _stream_frame({
+            "type": "summary",
+            "endpoint": request.endpoint,
+            "method": request.method,
+            "differences_found": found,
+            "is_regression": verdict.is_regression,
+            "regression_severity": verdict.severity,
+            "risk_counts": verdict.risk_counts,
+            "counts_by_type": verdict.counts_by_type,
+            "diff_truncated": truncated,
+            "timestamp": datetime.now(),
+        }, format)
     
-    # Calculate summary
-    total = len(results)
-    regressions = sum(1 for r in results if r.get("is_regression", False))
-    critical = sum(1 for r in results if r.get("regression_severity") == "critical")
-    warnings = sum(1 for r in results if r.get("regression_severity") in ["medium", "high"])
+    return StreamingResponse(frames(), media_type=STREAM_MEDIA_TYPES[format])
+
+class _PageReader:
+    """One side of a paged comparison: the items of a cursor-paginated collection, a page at a time"""
     
-    # Health score: 100 - (regressions * 20) - (warnings * 10)
-    health_score = max(0, 100 - (regressions * 20) - (warnings * 10))
+    def __init__(self, client: httpx.AsyncClient, label: str, url: str, params: Dict[str, Any], timeout: float):
+        self.client = client
+        self.label = label
+        self.url = url
+        self.params = params
+        self.timeout = timeout
+        self.items: deque = deque()
+        self.cursor: Optional[str] = None
+        self.done = False
+        self.pages = 0
+        self.count: Any = None
+        self.error: Optional[str] = None
     
-    summary = RegressionSummary(
-        total_endpoints_tested=total,
-        regressions_found=regressions,
-        critical_regressions=critical,
-        warnings=warnings,
-        health_score=health_score,
-        results=results
-    )
+    async def fetch(self) -> None:
+        params = dict(self.params, cursor=self.cursor) if self.cursor else self.params
+        try:
+            async with host_slot(self.url):
+                response = await self.client.get(self.url, params=params, timeout=self.timeout)
+        except httpx.TimeoutException:
+            self.error, self.done = f"{self.label} timed out after {self.timeout}s", True
+            return
+        except httpx.RequestError as e:
+            self.error, self.done = f"{self.label} request failed: {str(e)}", True
+            return
+        if response.status_code != 200:
+            self.error, self.done = f"{self.label} returned {response.status_code}: {response.text[:100]}", True
+            return
+        try:
+            page = response.json()
+        except ValueError:
+            self.error, self.done = f"{self.label} returned a body that isn't JSON: {response.text[:100]}", True
+            return
+        if not isinstance(page, dict) or not isinstance(page.get("items") or [], list):
+            self.error, self.done = f"{self.label} returned something other than a page of items", True
+            return
+        self.pages += 1
+        self.items.extend(page.get("items") or [])
+        if self.pages == 1:
+            # Only the first page carries the total
+            self.count = page.get("count")
+        self.cursor = page.get("next_cursor")
+        self.done = not self.cursor
+
+@router.post("/compare/paged")
+async def compare_endpoints_paged(request: PagedComparisonRequest):
+    """Compare a paginated collection (e.g. /get or /items) page by page
+    
+    Both sides are read with ``limit=page_size`` and followed along their
+    ``next_cursor``, so only about a page per side is held at a time. Items
+    are paired by position across pages and reported as ``items[i]``;
+    ``count`` is compared as well. The diff budget applies to the whole
+    run and stops fetching once it is used up. Neither collection is
+    returned.
+    """
+    if request.page_size <= 0:
+        raise HTTPException(status_code=400, detail="page_size must be positive")
+    client = get_http_client()
+    timeout = request.timeout_s or REQUEST_TIMEOUT_S
+    params = dict(request.params or {}, limit=request.page_size)
+    v1 = _PageReader(client, "v1", f"{BASE_URL}/api/{request.v1_version or 'v1'}{request.endpoint}", params, timeout)
+    v2 = _PageReader(client, "v2", f"{BASE_URL}/api/{request.v2_version or 'v2'}{request.endpoint}", params, timeout)
+    options = request.diff_options
+    budget = _diff_budget(options)
+    differences: List[Dict[str, Any]] = []
+    index = 0
+    counted = False
+    
+    while not budget.full:
+        await asyncio.gather(*[side.fetch() for side in (v1, v2) if not side.items and not side.done])
+        if v1.error or v2.error:
+            break
+        if not counted:
+            differences.extend(DiffEngine.iter_differences(v1.count, v2.count, "count", options=options, budget=budget))
+            counted = True
+        
+        if v1.items and v2.items:
+            for _ in range(min(len(v1.items), len(v2.items))):
+                node = ("items", index, True)
+                differences.extend(DiffEngine.iter_differences(
+                    v1.items.popleft(), v2.items.popleft(), node, options=options, budget=budget
+                ))
+                index += 1
+                if budget.full:
+                    break
+        elif v1.items or v2.items:
+            # The other side has run out: the rest are missing on it
+            side, missing_in = (v1, "v2") if v1.items else (v2, "v1")
+            while side.items and not budget.full:
+                node = ("items", index, True)
+                diff = budget.admit(node, missing_difference(node, True, missing_in, side.items.popleft(),
+                                                             options or DEFAULT_DIFF_OPTIONS))
+                if diff is not None:
+                    differences.append(diff)
+                index += 1
+        elif v1.done and v2.done:
+            break
     
-    return summary
+    error_difference = _error_difference(v1.error, v2.error, options)
+    if error_difference:
+        differences.append(error_difference)
+    verdict = DiffEngine.classify(differences)
+    return {
+        "endpoint": request.endpoint,
+        "method": "GET",
+        "v1_count": v1.count,
+        "v2_count": v2.count,
+        "pages": {"v1": v1.pages, "v2": v2.pages},
+        "items_compared": index,
+        "differences": differences,
+        "is_regression": verdict.is_regression,
+        "regression_severity": verdict.severity,
+        "risk_counts": verdict.risk_counts,
+        "counts_by_type": verdict.counts_by_type,
+        "diff_truncated": budget.truncated,
+        "diff_truncation_reason": budget.reason,
+        "diff_summary": budget.summary if budget.truncated else None,
+        "timestamp": datetime.now(),
+    }
+
+@router.post("/diff-batch")
+async def diff_batch(request: BatchDiffRequest):
+    """Diff many recorded (v1, v2) response pairs in one call
+    
+    Pairs that share a shape are diffed column by column (see
+    batch_diff.compare_batch), which is much cheaper than one deep_compare
+    per pair when replaying thousands of recorded requests. Runs in a
+    worker thread so the event loop keeps serving other requests.
+    """
+    pairs = [(pair.v1_response, pair.v2_response) for pair in request.pairs]
+    all_differences = await anyio.to_thread.run_sync(compare_batch, pairs, request.diff_options)
+    
+    results = []
+    for differences in all_differences:
+        verdict = DiffEngine.classify(differences)
+        results.append({
+            "differences": differences,
+            "is_regression": verdict.is_regression,
+            "regression_severity": verdict.severity,
+            "risk_counts": verdict.risk_counts,
+            "counts_by_type": verdict.counts_by_type
+        })
+    return {
+        "total_pairs": len(results),
+        "regressions_found": sum(1 for r in results if r["is_regression"]),
+        "results": results
+    }
+
+@router.get("/schema-changes")
+async def get_schema_changes(v1_version: str = "v1", v2_version: str = "v2"):
+    """List endpoints whose responses changed structure between two versions
+    
+    Uses the schema fingerprints recorded by /compare (and /compare-all), so
+    nothing is fetched or diffed: each endpoint's latest responses on both
+    versions are checked, and changed ones come with the added, removed and
+    retyped paths.
+    """
+    return schema_changes(v1_version, v2_version)
+
+@router.get("/diff-cache")
+async def get_diff_cache_stats():
+    """Hit/miss statistics for the diff result cache used by /compare and /run-test"""
+    return diff_cache.stats()
+
+@router.delete("/diff-cache")
+async def clear_diff_cache():
+    """Drop every cached diff result (the statistics are kept)"""
+    diff_cache.clear()
+    return diff_cache.stats()
 
 @router.get("/history")
 async def get_comparison_history():
@@ -493,27 +934,18 @@ async def run_test_case(request_data: Dict[str, Any]):
             failure_reasons.append(f"Permission denied: Endpoint requires admin role, but test was run with '{role}' role")
         
         if result.is_regression:
-            diff_summary = ", ".join([d.get("path", "unknown") for d in result.differences[:3]])
+            diff_summary = ", ".join([difference_path(d) for d in result.differences[:3]])
             failure_reasons.append(f"Regression detected: {len(result.differences)} difference(s) found. Key differences: {diff_summary}")
         
+        # Subtrees the diff budget never compared could hide a regression
+        unexplored = sum(counts.get("unexplored", 0) for counts in (result.diff_summary or {}).values())
+        if unexplored:
+            failure_reasons.append(f"Diff incomplete: {unexplored} comparison(s) skipped ({result.diff_truncation_reason})")
+        
         failure_reason = ". ".join(failure_reasons) if failure_reasons else None
         
-        # Determine status: failed if permission denied OR regression detected
-        status = "failed" if (permission_denied or result.is_regression) else "passed"
-        
-        # Calculate risk counts from differences
-        risk_counts = {"low": 0, "medium": 0, "high": 0}
-        if result.differences:
-            for diff in result.differences:
-                if diff.get("is_expected", False):
-                    continue  # Skip expected differences
-                severity = diff.get("severity", "low")
-                if severity == "high" or severity == "critical":
-                    risk_counts["high"] += 1
-                elif severity == "medium":
-                    risk_counts["medium"] += 1
-                else:
-                    risk_counts["low"] += 1
+        # Determine status: failed if permission denied, regression detected or the diff was cut short
+        status = "failed" if (permission_denied or result.is_regression or unexplored) else "passed"
         
         return {
             "status": status,
@@ -521,7 +953,7 @@ async def run_test_case(request_data: Dict[str, Any]):
             "test_case": test_case,
             "result": result,  # Always include comparison result (has v1_request_time_ms and v2_request_time_ms)
             "permission_denied": permission_denied,
-            "risk_counts": risk_counts
+            "risk_counts": result.risk_counts
         }
     except Exception as e:
         test_case = request_data.get("test_case", {}) if 'request_data' in locals() else {}
@@ -533,4 +965,25 @@ async def run_test_case(request_data: Dict[str, Any]):
         }
 
 
-
+@router.post("/run-test-batch")
+async def run_test_cases_batch(request: BatchTestRunRequest):
+    """Run many test cases in one call and roll up pass/fail totals
+    
+    Each case goes through the same logic as /run-test; cases run
+    concurrently with creates ahead of reads, updates and deletes.
+    """
+    async def run_one(test_case: TestCase):
+        return await run_test_case({
+            "test_case": test_case.model_dump(),
+            "role": request.role,
+            "v1_version": request.v1_version,
+            "v2_version": request.v2_version,
+        })
+    
+    results = await run_comparisons(request.test_cases, run_one, request.concurrency)
+    
+    totals = {"total": len(results), "passed": 0, "failed": 0, "error": 0}
+    for result in results:
+        totals[result.get("status", "error")] += 1
+    
+    return {"results": results, "totals": totals}
@@ -0,0 +1,83 @@
+import os
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.models import ComparisonRequest, EndpointType
+
+# Default number of comparisons allowed in flight at once
+COMPARE_CONCURRENCY = int(os.getenv("COMPARE_CONCURRENCY", "16"))
+
+# Comparisons run in phases so that e.g. a create is finished before the
+# reads, updates and deletes that may depend on it start
+PHASE_ORDER = [EndpointType.CREATE, EndpointType.GET, EndpointType.UPDATE, EndpointType.DELETE]
+
+
+def endpoint_phase(request: ComparisonRequest) -> EndpointType:
+    """Classify a comparison as create/get/update/delete for ordering
+
+    Works for anything with ``method`` and ``endpoint`` attributes, so test
+    cases can be scheduled the same way. The path wins over the method, so
+    e.g. ``POST /bulk/delete`` runs with the deletes.
+    """
+    method = request.method.upper()
+    endpoint = request.endpoint.lower()
+    if "/delete" in endpoint:
+        return EndpointType.DELETE
+    if "/update" in endpoint:
+        return EndpointType.UPDATE
+    if "/create" in endpoint:
+        return EndpointType.CREATE
+    if method == "POST":
+        return EndpointType.CREATE
+    if method == "PUT":
+        return EndpointType.UPDATE
+    if method == "DELETE":
+        return EndpointType.DELETE
+    return EndpointType.GET
+
+
+def plan_phases(requests: Sequence[ComparisonRequest]) -> List[List[Tuple[int, ComparisonRequest]]]:
+    """Group requests (with their original index) into dependency-ordered phases"""
+    phases: Dict[EndpointType, List[Tuple[int, ComparisonRequest]]] = {phase: [] for phase in PHASE_ORDER}
+    for index, request in enumerate(requests):
+        phases[endpoint_phase(request)].append((index, request))
+    return [phases[phase] for phase in PHASE_ORDER if phases[phase]]
+
+
+async def iter_comparisons(
+    requests: Sequence[ComparisonRequest],
+    compare: Callable[[ComparisonRequest], Awaitable[Any]],
+    concurrency: Optional[int] = None,
+) -> AsyncIterator[Tuple[int, Any]]:
+    """Run comparisons with bounded concurrency, yielding (index, result) as each finishes.
+
+    Phases run one after another; within a phase at most ``concurrency``
+    comparisons are in flight. If one comparison fails, the rest are
+    cancelled and the error propagates, as it would in a sequential loop.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency or COMPARE_CONCURRENCY))
+
+    async def run_one(index: int, request: ComparisonRequest):
+        async with semaphore:
+            return index, await compare(request)
+
+    for phase in plan_phases(requests):
+        tasks = [asyncio.ensure_future(run_one(index, request)) for index, request in phase]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+async def run_comparisons(
+    requests: Sequence[ComparisonRequest],
+    compare: Callable[[ComparisonRequest], Awaitable[Any]],
+    concurrency: Optional[int] = None,
+) -> List[Any]:
+    """Run comparisons with bounded concurrency and return results in input order"""
+    results: List[Any] = [None] * len(requests)
+    async for index, result in iter_comparisons(requests, compare, concurrency):
+        results[index] = result
+    return results
@@ -0,0 +1,151 @@
+import os
+import hashlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
+
+# Distinct response bodies whose schemas are remembered, so a body seen before
+# is fingerprinted by hashing its bytes instead of walking the parsed document
+SCHEMA_CACHE_SIZE = int(os.getenv("SCHEMA_CACHE_SIZE", "256"))
+# (method, endpoint, version) fingerprints kept for /schema-changes; endpoints
+# carry their ids (/get/123), so the least recently recorded are dropped past this
+SCHEMA_FINGERPRINTS_SIZE = int(os.getenv("SCHEMA_FINGERPRINTS_SIZE", "4096"))
+
+# (pattern path, type name) pairs, with every list index written as [*]
+SchemaPaths = FrozenSet[Tuple[str, str]]
+
+_CONTAINER_TYPES = (dict, list)
+
+
+def schema_paths(data: Any) -> SchemaPaths:
+    """The structure of a JSON document: every (pattern path, type name) in it.
+
+    Paths follow the diff engine's pattern form ("items[*].price") and types
+    its type names, so two documents have the same schema paths exactly
+    when they hold the same types at the same places.
+    """
+    found: Set[Tuple[str, str]] = {("", type(data).__name__)}
+    add = found.add
+    stack = [(data, "")] if isinstance(data, _CONTAINER_TYPES) else []
+    while stack:
+        value, path = stack.pop()
+        if type(value) is dict:
+            prefix = f"{path}." if path else ""
+            for key, child in value.items():
+                child_path = prefix + key
+                add((child_path, type(child).__name__))
+                if isinstance(child, _CONTAINER_TYPES):
+                    stack.append((child, child_path))
+        else:
+            child_path = f"{path}[*]"
+            for child_type in set(map(type, value)):
+                add((child_path, child_type.__name__))
+            stack.extend((child, child_path) for child in value if isinstance(child, _CONTAINER_TYPES))
+    return frozenset(found)
+
+
+class SchemaFingerprint:
+    """A response's schema paths and a short hash of them"""
+
+    __slots__ = ("fingerprint", "paths")
+
+    def __init__(self, paths: SchemaPaths):
+        self.paths = paths
+        encoded = "\n".join(sorted(f"{path}\t{type_name}" for path, type_name in paths)).encode()
+        self.fingerprint = hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+# Body digest -> fingerprint, least recently used first
+_body_cache: "OrderedDict[bytes, SchemaFingerprint]" = OrderedDict()
+# (method, endpoint, version) -> latest fingerprint and when it was recorded,
+# least recently recorded first
+_fingerprints: "OrderedDict[Tuple[str, str, str], Tuple[SchemaFingerprint, datetime]]" = OrderedDict()
+
+
+def cached_fingerprint(body_hash: bytes) -> Optional[SchemaFingerprint]:
+    """The fingerprint of a body seen before (by its diff_cache.content_hash), if still remembered"""
+    fingerprint = _body_cache.get(body_hash)
+    if fingerprint is not None:
+        _body_cache.move_to_end(body_hash)
+    return fingerprint
+
+
+def fingerprint_response(data: Any, body_hash: bytes, paths: Optional[SchemaPaths] = None) -> SchemaFingerprint:
+    """Fingerprint a parsed response, ``body_hash`` being its body's diff_cache.content_hash.
+
+    Pass ``paths`` when its schema_paths were already collected (the diff
+    worker does so for large bodies) to skip walking ``data``.
+    """
+    fingerprint = cached_fingerprint(body_hash)
+    if fingerprint is not None:
+        return fingerprint
+    fingerprint = SchemaFingerprint(paths if paths is not None else schema_paths(data))
+    _body_cache[body_hash] = fingerprint
+    if len(_body_cache) > SCHEMA_CACHE_SIZE:
+        _body_cache.popitem(last=False)
+    return fingerprint
+
+
+def record_schema(method: str, endpoint: str, version: str, fingerprint: Optional[SchemaFingerprint]) -> None:
+    """Keep a response's fingerprint as the latest for (method, endpoint, version).
+
+    None (the request failed or returned an error status) records nothing.
+    """
+    if fingerprint is None:
+        return
+    key = (method, endpoint, version)
+    _fingerprints[key] = (fingerprint, datetime.now())
+    _fingerprints.move_to_end(key)
+    if len(_fingerprints) > SCHEMA_FINGERPRINTS_SIZE:
+        _fingerprints.popitem(last=False)
+
+
+def _types_by_path(paths: SchemaPaths) -> Dict[str, Set[str]]:
+    types: Dict[str, Set[str]] = {}
+    for path, type_name in paths:
+        types.setdefault(path, set()).add(type_name)
+    return types
+
+
+def schema_changes(v1_version: str = "v1", v2_version: str = "v2") -> Dict[str, Any]:
+    """Endpoints whose latest v1 and v2 responses differ in structure.
+
+    Works from the recorded fingerprints only, so no responses are fetched
+    or diffed; endpoints not yet seen on both versions are left out.
+    """
+    changed: List[Dict[str, Any]] = []
+    unchanged = 0
+    for (method, endpoint, version), (v1_schema, v1_recorded) in sorted(_fingerprints.items()):
+        if version != v1_version:
+            continue
+        recorded = _fingerprints.get((method, endpoint, v2_version))
+        if recorded is None:
+            continue
+        v2_schema, v2_recorded = recorded
+        if v1_schema.fingerprint == v2_schema.fingerprint:
+            unchanged += 1
+            continue
+
+        v1_types = _types_by_path(v1_schema.paths)
+        v2_types = _types_by_path(v2_schema.paths)
+        changed.append({
+            "endpoint": endpoint,
+            "method": method,
+            "v1_fingerprint": v1_schema.fingerprint,
+            "v2_fingerprint": v2_schema.fingerprint,
+            "removed_paths": sorted(path for path in v1_types if path not in v2_types),
+            "added_paths": sorted(path for path in v2_types if path not in v1_types),
+            "retyped_paths": [
+                {"path": path, "v1_types": sorted(types), "v2_types": sorted(v2_types[path])}
+                for path, types in sorted(v1_types.items())
+                if path in v2_types and types != v2_types[path]
+            ],
+            "v1_recorded_at": v1_recorded,
+            "v2_recorded_at": v2_recorded,
+        })
+    return {
+        "v1_version": v1_version,
+        "v2_version": v2_version,
+        "changed": changed,
+        "unchanged_count": unchanged,
+    }
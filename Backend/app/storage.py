@@ -0,0 +1,34 @@
+import os
+from typing import Any, Callable, Optional
+
+import anyio
+
+# Max storage calls (Supabase, SQLite) blocking a worker thread at once;
+# requests past this wait their turn instead of each holding a thread (the
+# default pool has 40 for all of to_thread)
+STORAGE_MAX_THREADS = int(os.getenv("STORAGE_MAX_THREADS", "16"))
+
+_limiter: Optional[anyio.CapacityLimiter] = None
+
+
+def _get_limiter() -> anyio.CapacityLimiter:
+    # Created on first use, since a limiter needs a running event loop
+    global _limiter
+    if _limiter is None:
+        _limiter = anyio.CapacityLimiter(STORAGE_MAX_THREADS)
+    return _limiter
+
+
+async def run_sync(func: Callable[..., Any], *args: Any) -> Any:
+    """Run a blocking storage call in a worker thread, under the storage thread limit"""
+    return await anyio.to_thread.run_sync(func, *args, limiter=_get_limiter())
+
+
+async def execute(query: Any) -> Any:
+    """Run a Supabase query builder's blocking .execute() in a worker thread.
+
+    The synchronous client does network I/O inside execute(), so calling it
+    straight from an async handler stalls every other request on the worker
+    until the database answers.
+    """
+    return await run_sync(query.execute)
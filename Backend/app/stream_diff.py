@@ -0,0 +1,319 @@
+import os
+import hashlib
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.diff_engine import DiffEngine, DEFAULT_DIFF_OPTIONS, _compact_diff, _render_path
+from app.models import DiffOptions
+
+try:
+    import ijson
+except ImportError:  # Only needed for streaming comparisons
+    ijson = None
+
+STREAMING_AVAILABLE = ijson is not None
+
+# Values that have to be held to realign the two streams (reordered or extra
+# map keys, surplus list items, type mismatches) are kept up to this many
+# bytes; bigger ones are only hashed and reported without their values
+STREAM_BUFFER_BYTES = int(os.getenv("STREAM_BUFFER_BYTES", "65536"))
+
+Event = Tuple[str, Any]
+NextEvent = Callable[[], Awaitable[Event]]
+
+_TYPE_NAMES = {"start_map": "dict", "start_array": "list"}
+
+
+class _BodyReader:
+    """Async file-like view of a streamed httpx response body, for ijson"""
+
+    def __init__(self, response: httpx.Response):
+        self._chunks = response.aiter_bytes()
+
+    async def read(self, size: int = -1) -> bytes:
+        # ijson probes with read(0) to check for bytes vs str
+        if size == 0:
+            return b""
+        try:
+            return await self._chunks.__anext__()
+        except StopAsyncIteration:
+            return b""
+
+
+def response_events(response: httpx.Response) -> AsyncIterator[Event]:
+    """JSON parse events for a streamed response, read chunk by chunk"""
+    return ijson.basic_parse_async(_BodyReader(response), use_float=True)
+
+
+class _Elided:
+    """Stand-in for a value too big to buffer: its type and a digest of its events"""
+
+    __slots__ = ("type_name", "digest")
+
+    def __init__(self, type_name: str, digest: bytes):
+        self.type_name = type_name
+        self.digest = digest
+
+
+def _event_bytes(event: str, value: Any) -> bytes:
+    # 1 and 1.0 compare equal, so they have to digest alike
+    if type(value) is float and value.is_integer():
+        value = int(value)
+    return f"{event}\x00{value!r}\x1e".encode()
+
+
+class _ValueDigest:
+    """Digest of one value's parse events that, like ==, ignores map key order.
+
+    A real digest rather than hash(), whose collisions (hash(-1) == hash(-2))
+    would make different values look equal. Array items are hashed in
+    order; each map entry is hashed on its own and the entries combined in
+    sorted order once the map closes, so an open map holds a digest per key.
+    """
+
+    __slots__ = ("_frames", "digest")
+
+    def __init__(self):
+        # Per open container: a running hash (array) or [current key, entry digests] (map)
+        self._frames: List[Any] = []
+        self.digest: Optional[bytes] = None
+
+    def add(self, event: str, value: Any) -> None:
+        if event == "start_map":
+            self._frames.append([None, []])
+        elif event == "start_array":
+            self._frames.append(hashlib.blake2b(b"[", digest_size=16))
+        elif event == "map_key":
+            self._frames[-1][0] = value
+        elif event == "end_map":
+            combined = hashlib.blake2b(b"{", digest_size=16)
+            for entry in sorted(self._frames.pop()[1]):
+                combined.update(entry)
+            self._add(b"\x01" + combined.digest())
+        elif event == "end_array":
+            self._add(b"\x01" + self._frames.pop().digest())
+        else:
+            self._add(_event_bytes(event, value))
+
+    def _add(self, data: bytes) -> None:
+        # ``data`` is a scalar's event bytes or \x01 and a closed container's digest
+        if not self._frames:
+            self.digest = hashlib.blake2b(data, digest_size=16).digest()
+            return
+        frame = self._frames[-1]
+        if isinstance(frame, list):
+            frame[1].append(hashlib.blake2b(f"{frame[0]!r}\x00".encode() + data, digest_size=16).digest())
+        else:
+            frame.update(data)
+
+
+class _Frame:
+    """An open map or array on both sides of the lockstep walk"""
+
+    __slots__ = ("is_map", "node", "done1", "done2", "index", "pending1", "pending2")
+
+    def __init__(self, is_map: bool, node: Any):
+        self.is_map = is_map
+        self.node = node
+        self.done1 = False
+        self.done2 = False
+        self.index = 0
+        # Map values seen on one side only so far, by key
+        self.pending1: Dict[str, Any] = {}
+        self.pending2: Dict[str, Any] = {}
+
+
+async def _read_value(next_event: NextEvent, first: Event, limit: int) -> Any:
+    """Consume one complete value whose first event is ``first``.
+
+    Containers are rebuilt while their encoding stays under ``limit``;
+    past that, the rest is only hashed and an _Elided is returned.
+    """
+    event, value = first
+    if event not in _TYPE_NAMES:
+        return value
+
+    root: Any = {} if event == "start_map" else []
+    containers: Optional[List[Any]] = [root]
+    keys: List[Any] = [None]
+    digest = _ValueDigest()
+    digest.add(event, value)
+    size = 2
+    depth = 1
+    while depth:
+        event, value = await next_event()
+        digest.add(event, value)
+        if event == "start_map" or event == "start_array":
+            depth += 1
+        elif event == "end_map" or event == "end_array":
+            depth -= 1
+        if containers is None:
+            continue
+
+        size += len(value) + 3 if isinstance(value, str) else 8
+        if size > limit:
+            containers = None
+        elif event == "map_key":
+            keys[-1] = value
+        elif event == "end_map" or event == "end_array":
+            containers.pop()
+            keys.pop()
+        else:
+            if event == "start_map" or event == "start_array":
+                item: Any = {} if event == "start_map" else []
+            else:
+                item = value
+            parent = containers[-1]
+            if isinstance(parent, list):
+                parent.append(item)
+            else:
+                parent[keys[-1]] = item
+            if item is not value:
+                containers.append(item)
+                keys.append(None)
+    return root if containers is not None else _Elided(_TYPE_NAMES[first[0]], digest.digest)
+
+
+def _type_name(value: Any) -> str:
+    return value.type_name if isinstance(value, _Elided) else type(value).__name__
+
+
+def _finish(diff: Dict[str, Any], node: Any, options: DiffOptions) -> Dict[str, Any]:
+    """Apply the compact output form to a difference built here"""
+    if not options.compact:
+        return diff
+    compact = _compact_diff(diff, node, options.compact_value_bytes)
+    if diff.get("values_omitted"):
+        compact.pop("v1_value", None)
+        compact.pop("v2_value", None)
+        compact["values_omitted"] = True
+    return compact
+
+
+def _pair_differences(node: Any, v1: Any, v2: Any, options: DiffOptions) -> List[Dict[str, Any]]:
+    """Differences between two buffered values at the same path"""
+    if not isinstance(v1, _Elided) and not isinstance(v2, _Elided):
+        if v1 == v2:
+            return []
+        return DiffEngine.deep_compare(v1, v2, node, options=options)
+    if isinstance(v1, _Elided) and isinstance(v2, _Elided) and v1.digest == v2.digest:
+        return []
+
+    v1_type, v2_type = _type_name(v1), _type_name(v2)
+    diff = {
+        "path": _render_path(node),
+        "type": "type_mismatch" if v1_type != v2_type else "value_mismatch",
+        "v1_value": None,
+        "v2_value": None,
+        "v1_type": v1_type,
+        "v2_type": v2_type,
+        "severity": "high" if v1_type != v2_type else "medium",
+        "values_omitted": True
+    }
+    return [_finish(diff, node, options)]
+
+
+def missing_difference(node: Any, is_index: bool, missing_in: str, value: Any,
+                       options: DiffOptions) -> Dict[str, Any]:
+    """A map key or list item present on one side only, as deep_compare reports it"""
+    path = _render_path(node)
+    elided = isinstance(value, _Elided)
+    shown = None if elided else value
+    if missing_in == "v1":
+        diff = {"path": path, "type": "missing_in_v1", "v1_value": None, "v2_value": shown, "severity": "medium"}
+        if not is_index and DiffEngine.is_expected_difference(path, "missing_in_v1", None, shown):
+            diff["is_expected"] = True
+            diff["severity"] = "low"
+    else:
+        diff = {"path": path, "type": "missing_in_v2", "v1_value": shown, "v2_value": None, "severity": "high"}
+        if not is_index and DiffEngine.is_expected_difference(path, "missing_in_v2", shown, None):
+            diff["is_expected"] = True
+            diff["severity"] = "medium"
+    if elided:
+        diff["v1_type" if missing_in == "v2" else "v2_type"] = value.type_name
+        diff["values_omitted"] = True
+    return _finish(diff, node, options)
+
+
+async def iter_stream_differences(v1_events: AsyncIterator[Event], v2_events: AsyncIterator[Event],
+                                  options: Optional[DiffOptions] = None) -> AsyncIterator[Dict[str, Any]]:
+    """Diff two JSON documents from their parse event streams, yielding differences as found.
+
+    Both streams are read in lockstep, so when the documents share their
+    layout only one open container per nesting level is held, whatever the
+    document size. Map keys that arrive in a different order or on one side
+    only, surplus list items and mismatched types are buffered (up to
+    STREAM_BUFFER_BYTES per value) until they can be paired or reported.
+
+    Differences match deep_compare's, except that lists are always paired
+    by position and each map's missing keys are reported when it closes.
+    """
+    options = (options or DEFAULT_DIFF_OPTIONS).model_copy(update={
+        "list_alignment": "index", "unordered_paths": (),
+        "max_differences": None, "max_depth": None, "max_value_bytes": None,
+    })
+    limit = STREAM_BUFFER_BYTES
+    next1 = v1_events.__anext__
+    next2 = v2_events.__anext__
+    frames: List[_Frame] = []
+
+    async def open_value(node: Any, first1: Event, first2: Event) -> List[Dict[str, Any]]:
+        if first1[0] == first2[0] and first1[0] in _TYPE_NAMES:
+            frames.append(_Frame(first1[0] == "start_map", node))
+            return []
+        v1 = await _read_value(next1, first1, limit)
+        v2 = await _read_value(next2, first2, limit)
+        return _pair_differences(node, v1, v2, options)
+
+    for diff in await open_value("", await next1(), await next2()):
+        yield diff
+
+    while frames:
+        frame = frames[-1]
+        end_event = "end_map" if frame.is_map else "end_array"
+        e1 = None if frame.done1 else await next1()
+        e2 = None if frame.done2 else await next2()
+        if e1 is not None and e1[0] == end_event:
+            frame.done1, e1 = True, None
+        if e2 is not None and e2[0] == end_event:
+            frame.done2, e2 = True, None
+
+        differences: List[Dict[str, Any]] = []
+        if frame.is_map:
+            if e1 is not None and e2 is not None and e1[1] == e2[1]:
+                differences = await open_value((frame.node, e1[1], False), await next1(), await next2())
+            else:
+                if e1 is not None:
+                    key = e1[1]
+                    value = await _read_value(next1, await next1(), limit)
+                    if key in frame.pending2:
+                        differences += _pair_differences((frame.node, key, False), value, frame.pending2.pop(key), options)
+                    else:
+                        frame.pending1[key] = value
+                if e2 is not None:
+                    key = e2[1]
+                    value = await _read_value(next2, await next2(), limit)
+                    if key in frame.pending1:
+                        differences += _pair_differences((frame.node, key, False), frame.pending1.pop(key), value, options)
+                    else:
+                        frame.pending2[key] = value
+        else:
+            child = (frame.node, frame.index, True)
+            frame.index += 1
+            if e1 is not None and e2 is not None:
+                differences = await open_value(child, e1, e2)
+            elif e1 is not None:
+                differences = [missing_difference(child, True, "v2", await _read_value(next1, e1, limit), options)]
+            elif e2 is not None:
+                differences = [missing_difference(child, True, "v1", await _read_value(next2, e2, limit), options)]
+
+        if frame.done1 and frame.done2:
+            frames.pop()
+            for key, value in frame.pending1.items():
+                differences.append(missing_difference((frame.node, key, False), False, "v2", value, options))
+            for key, value in frame.pending2.items():
+                differences.append(missing_difference((frame.node, key, False), False, "v1", value, options))
+
+        for diff in differences:
+            yield diff
@@ -0,0 +1,61 @@
+import json
+import random
+
+from app.batch_diff import compare_batch
+from app.diff_engine import DiffEngine
+from app.models import DiffOptions, NumericTolerance
+
+
+def _canonical(differences):
+    return sorted(json.dumps(diff, sort_keys=True, default=repr) for diff in differences)
+
+
+def _assert_matches_deep_compare(pairs, options=None):
+    for (v1, v2), differences in zip(pairs, compare_batch(pairs, options)):
+        assert _canonical(differences) == _canonical(DiffEngine.deep_compare(v1, v2, options=options))
+
+
+def _random_value(rng, depth=0):
+    roll = rng.random()
+    if depth < 3 and roll < 0.25:
+        return {key: _random_value(rng, depth + 1) for key in rng.sample("abc", rng.randint(0, 3))}
+    if depth < 3 and roll < 0.4:
+        return [_random_value(rng, depth + 1) for _ in range(rng.randint(0, 3))]
+    return rng.choice([None, 0, 1, 2, 1.5, "x", "y", True])
+
+
+def _mutate(rng, value):
+    if isinstance(value, dict):
+        return {key: _mutate(rng, child) for key, child in value.items()}
+    if isinstance(value, list):
+        return [_mutate(rng, child) for child in value]
+    return rng.choice([None, 0, 1, 2, 1.5, "x", "y", True]) if rng.random() < 0.3 else value
+
+
+def test_same_leaf_count_different_layouts():
+    pairs = [({"a": None, "b": {"c": 1}}, {"a": None, "b": {"c": 2}})] * 3
+    pairs.append(({"a": {"c": 1}, "b": None}, {"a": {"c": 2}, "b": None}))
+    results = compare_batch(pairs)
+    assert [diff["path"] for diff in results[3]] == ["a.c"]
+    _assert_matches_deep_compare(pairs)
+
+
+def test_random_pairs_match_deep_compare():
+    rng = random.Random(17)
+    # Few distinct shapes, so most pairs go through the grouped path
+    templates = [_random_value(rng) for _ in range(40)]
+    pairs = []
+    for _ in range(15000):
+        v1 = _mutate(rng, rng.choice(templates))
+        v2 = _mutate(rng, rng.choice(templates) if rng.random() < 0.1 else v1)
+        pairs.append((v1, v2))
+    _assert_matches_deep_compare(pairs)
+
+
+def test_tolerance_rule_picked_per_row():
+    options = DiffOptions(numeric_tolerances=(
+        NumericTolerance(type="int", abs_tolerance=5),
+        NumericTolerance(type="float", abs_tolerance=0),
+    ))
+    pairs = [({"v": 1}, {"v": 2})] * 3 + [({"v": 1.0}, {"v": 2.5}), ({"v": 1}, {"v": 1.5})]
+    _assert_matches_deep_compare(pairs, options)
@@ -0,0 +1,118 @@
+import asyncio
+import base64
+import json
+
+import pytest
+
+from app.product_store import (
+    PRODUCT_PAGE_MAX,
+    MemoryProductStore,
+    SQLiteProductStore,
+    bulk_delete,
+    bulk_insert,
+    bulk_update,
+    encode_cursor,
+    list_products,
+)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryProductStore()
+    return SQLiteProductStore(str(tmp_path / "products.db"), "products")
+
+
+def _items(count):
+    return [
+        {
+            "id": f"item-{index:02d}",
+            "name": f"Item {index}",
+            "value": index,
+            "status": "active" if index % 3 else "archived",
+            "created_at": f"2024-01-01T00:00:{index:02d}",
+        }
+        for index in range(count)
+    ]
+
+
+def _fill(store, items):
+    asyncio.run(bulk_insert(store, items))
+
+
+def test_pages_follow_the_status_filter(store):
+    items = _items(25)
+    _fill(store, items)
+    active = [item["id"] for item in items if item["status"] == "active"]
+
+    async def walk():
+        pages, cursor = [], None
+        while True:
+            page = await list_products(store, status="active", limit=4, cursor=cursor, fields="id,status")
+            pages.append(page)
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return pages
+
+    pages = asyncio.run(walk())
+    assert [item["id"] for page in pages for item in page["items"]] == active
+    assert all(set(item) == {"id", "status"} for page in pages for item in page["items"])
+    # Only the first page is counted
+    assert pages[0]["count"] == len(active)
+    assert all(page["count"] is None for page in pages[1:])
+
+
+def test_unpaged_list_counts_everything(store):
+    _fill(store, _items(7))
+    body = asyncio.run(list_products(store, status="archived"))
+    assert [item["id"] for item in body["items"]] == ["item-00", "item-03", "item-06"]
+    assert body["count"] == 3
+
+
+@pytest.mark.parametrize("arguments", [
+    {"cursor": "not a cursor"},
+    # Would end up inside the Supabase or=(...) filter
+    {"cursor": base64.urlsafe_b64encode(json.dumps(['2024-01-01",id.gt."', "x"]).encode()).decode()},
+    {"cursor": encode_cursor(("2024-01-01T00:00:00", 'item-01",status.eq."x'))},
+    {"limit": 0},
+    {"limit": PRODUCT_PAGE_MAX + 1},
+    {"limit": 5, "fields": "id;name"},
+])
+def test_bad_list_arguments_raise_value_error(store, arguments):
+    with pytest.raises(ValueError):
+        asyncio.run(list_products(store, **arguments))
+
+
+def test_bad_chunk_size_raises_value_error(store):
+    with pytest.raises(ValueError):
+        asyncio.run(bulk_insert(store, _items(1), chunk_size=0))
+
+
+def test_update_and_delete_of_a_missing_item_return_none(store):
+    _fill(store, _items(2))
+    assert asyncio.run(store.update("missing", {"name": "x"})) is None
+    assert asyncio.run(store.delete("missing")) is None
+    assert asyncio.run(store.count()) == 2
+
+
+def test_bulk_update_reports_each_change(store):
+    _fill(store, _items(3))
+    report = asyncio.run(bulk_update(store, [
+        {"id": "item-01", "name": "first"},
+        {"id": "item-01", "name": "second"},
+        {"id": "missing", "name": "x"},
+        {"name": "no id"},
+    ], chunk_size=2))
+    assert [result["status"] for result in report["results"]] == ["updated", "updated", "not_found", "failed"]
+    assert (report["succeeded"], report["failed"]) == (3, 1)
+    # Changes to the same item land in order
+    assert asyncio.run(store.get("item-01"))["name"] == "second"
+
+
+def test_bulk_delete_reports_repeats_and_missing_ids(store):
+    _fill(store, _items(3))
+    report = asyncio.run(bulk_delete(store, ["item-00", "item-00", "missing", "item-02"]))
+    assert [result["status"] for result in report["results"]] == ["deleted", "not_found", "not_found", "deleted"]
+    assert report["results"][0]["item"]["id"] == "item-00"
+    assert (report["succeeded"], report["failed"], report["failed_chunks"]) == (4, 0, [])
+    assert [item["id"] for item in asyncio.run(store.list())] == ["item-01"]
@@ -1,5 +1,6 @@
 import React, { useState } from 'react'
 import { motion } from 'framer-motion'
+import { diffPath } from '../utils/diffPath'
 
 const JsonDiff = ({ result }) => {
   const [expanded, setExpanded] = useState(false)
@@ -13,7 +14,7 @@ const JsonDiff = ({ result }) => {
     return (
       <div className="ml-4">
         {Object.entries(obj).map(([key, value]) => {
-          const diff = result.differences.find(d => d.path === key || d.path.startsWith(key + '.'))
+          const diff = result.differences.find(d => diffPath(d) === key || diffPath(d).startsWith(key + '.'))
           const isDifferent = !!diff
           
           return (
@@ -91,7 +92,7 @@ const JsonDiff = ({ result }) => {
                 className="text-xs bg-red-500/10 border-l-2 border-red-500 pl-3 py-2 rounded"
               >
                 <div className="font-semibold text-red-400 mb-1">
-                  Path: {diff.path}
+                  Path: {diffPath(diff)}
                 </div>
                 <div className="text-gray-300">
                   <div>Type: {diff.type}</div>
@@ -1,6 +1,7 @@
 import React, { useState } from 'react'
 import { motion } from 'framer-motion'
 import { aiAPI } from '../services/api'
+import { diffPath } from '../utils/diffPath'
 
 const TestCaseGenerator = ({
   onGenerate,
@@ -257,7 +258,7 @@ const TestCaseGenerator = ({
                             <div key={idx} className="flex items-start gap-2">
                               <span className="text-red-400">•</span>
                               <div className="flex-1">
-                                <span className="font-mono text-neon-cyan">{diff.path || 'unknown'}</span>
+                                <span className="font-mono text-neon-cyan">{diffPath(diff) || 'unknown'}</span>
                                 <span className="text-gray-500 mx-1">:</span>
                                 <span className="text-yellow-400">{diff.type || 'unknown'}</span>
                                 {diff.v1_value !== undefined && (
@@ -0,0 +1,14 @@
+/**
+ * Dotted path of a difference. Compact differences (diff_options.compact)
+ * carry a JSON pointer instead, so the path is rebuilt from it; numeric
+ * pointer tokens come back as list indexes, e.g. /items/3/name -> items[3].name
+ */
+export const diffPath = (diff, fallback = 'unknown') => {
+  if (typeof diff.path === 'string') return diff.path
+  if (typeof diff.pointer !== 'string') return fallback
+  return diff.pointer.split('/').slice(1).reduce((path, token) => {
+    const key = token.replace(/~1/g, '/').replace(/~0/g, '~')
+    if (/^\d+$/.test(key)) return `${path}[${key}]`
+    return path ? `${path}.${key}` : key
+  }, '')
+}